@@ -0,0 +1,182 @@
+"""Bear Hunt damage simulator: stat categories instead of one percentage.
+
+    !rally simulate Chenko:Stand of Arms:5 Howard:Defenders' Edge:4 | Fahd:5 troops=50000,100000
+
+The calculator adds every skill into one bonus. Here each skill goes to
+the stat its effect changes, and stats combine the way HERO_EFFECT_OPS
+says skills stack: values with the same op add, different ops multiply
+(the multiplicative rule's grouping, applied per stat):
+- offense: Attack Up, Lethality Up and Damage Up multiply the damage each
+  troop deals per round
+- defense: Enemy Troops Attack Down and Damage Taken Down shrink the
+  bear's hits, Health Up spreads them over sturdier troops
+
+A rally fights ROUNDS rounds. Each round its surviving troops deal
+troops x TROOP_DAMAGE x offense, then the bear's hit (BEAR_DAMAGE,
+scaled by the defensive stats) removes troops. The constants are
+illustrative units, not game data, so compare rallies against each other
+or against `baseline` (the same troops with no skills) rather than
+reading the damage as a game number. Chance skills are left to
+`!rally chance` and non-combat effects are ignored; only the counted
+top 4 joiners take part.
+
+Python API, vectorised over compositions and troop counts:
+
+    stats = rally_stats(captain_lists, joiner_lists)     # {stat: (rallies,) multipliers}
+    grid = simulate_damage(stats, [50_000, 100_000])     # {'damage': (rallies, troops), ...}
+"""
+import re
+
+import numpy as np
+
+import embed_templates as templates
+from hero_data import HERO_INDEX, HERO_SKILLS
+from rally_engine import MAX_CAPTAIN_HEROES, group_totals, top_joiner_mask
+from rally_syntax import parse_rally_spec
+
+ROUNDS = 10
+TROOP_DAMAGE = 1.0  # damage per troop per round before skills
+BEAR_DAMAGE = 2000.0  # bear damage per round before skills
+TROOP_HEALTH = 1.0  # damage that removes one troop before skills
+MIN_TAKEN = 0.05  # reductions never take a hit below 5%
+
+DEFAULT_TROOPS = (50_000, 100_000, 200_000)
+MAX_TROOP_COUNTS = 10
+MAX_TROOPS = 10_000_000
+SIMULATE_KEYS = ("troops", "rounds")
+
+STATS = ("attack", "lethality", "damage", "health", "damage_taken", "enemy_attack")
+OFFENSE = ("attack", "lethality", "damage")
+REDUCTIONS = ("damage_taken", "enemy_attack")
+STAT_NAMES = {
+    "attack": "Attack Up",
+    "lethality": "Lethality Up",
+    "damage": "Damage Up",
+    "health": "Health Up",
+    "damage_taken": "Damage Taken Down",
+    "enemy_attack": "Enemy Troops Attack Down",
+}
+# Effect name -> stat; Eric's Holy Warrior spells it "Enemy Troop Attack Down"
+EFFECT_STATS = {effect: stat for stat, effect in STAT_NAMES.items()}
+EFFECT_STATS["Enemy Troop Attack Down"] = "enemy_attack"
+STAT_INDEX = {stat: i for i, stat in enumerate(STATS)}
+
+
+def encode_stats(entry_lists, width=None):
+    """Pack entry lists into (hero index, stat index, value) arrays; -1 marks skills with no combat stat"""
+    if width is None:
+        width = max((len(entries) for entries in entry_lists), default=0)
+    heroes = np.full((len(entry_lists), width), -1, dtype=np.intp)
+    stats = np.full((len(entry_lists), width), -1, dtype=np.intp)
+    values = np.zeros((len(entry_lists), width), dtype=np.int32)
+    for row, entries in enumerate(entry_lists):
+        for col, entry in enumerate(entries):
+            heroes[row, col] = HERO_INDEX[entry['hero']]
+            stat = EFFECT_STATS.get(HERO_SKILLS[entry['hero']][entry['skill']]['effect'])
+            stats[row, col] = -1 if stat is None else STAT_INDEX[stat]
+            values[row, col] = entry['effect']
+    return heroes, stats, values
+
+
+def rally_stats(captains, joiners):
+    """{stat: (rallies,) multiplier} for parallel lists of captain and joiner entry lists.
+
+    Ups give prod(1 + group/100) and Downs prod(1 - group/100) over the
+    HERO_EFFECT_OPS groups, so a rally with no such skill gets 1.0.
+    """
+    captain_heroes, captain_stats, captain_values = encode_stats(captains, MAX_CAPTAIN_HEROES)
+    joiner_heroes, joiner_stats, joiner_values = encode_stats(joiners)
+    counted = top_joiner_mask(joiner_values)
+    heroes = np.concatenate([captain_heroes, np.where(counted, joiner_heroes, -1)], axis=1)
+    stats = np.concatenate([captain_stats, np.where(counted, joiner_stats, -1)], axis=1)
+    values = np.concatenate([captain_values, np.where(counted, joiner_values, 0)], axis=1)
+
+    multipliers = {}
+    for stat, index in STAT_INDEX.items():
+        match = stats == index
+        totals = group_totals(np.where(match, heroes, -1), np.where(match, values, 0)) / 100
+        if stat in REDUCTIONS:
+            multipliers[stat] = np.prod(np.clip(1 - totals, MIN_TAKEN, None), axis=1)
+        else:
+            multipliers[stat] = np.prod(1 + totals, axis=1)
+    return multipliers
+
+
+def simulate_damage(stats, troop_counts, rounds=ROUNDS, troop_damage=TROOP_DAMAGE,
+                    bear_damage=BEAR_DAMAGE, troop_health=TROOP_HEALTH):
+    """Fight every rally in `stats` with every troop count.
+
+    Returns (rallies, troop counts) arrays: 'damage' dealt, 'survivors'
+    after the last round, and 'baseline', the damage the same troops deal
+    with no skills. Scalars for the bear and troop constants broadcast, so
+    they can be swept too.
+    """
+    offense = np.prod([stats[stat] for stat in OFFENSE], axis=0)[:, None]
+    # Troops lost per bear hit
+    losses = (bear_damage * stats['enemy_attack'] * stats['damage_taken'] / (troop_health * stats['health']))[:, None]
+    start = np.asarray(troop_counts, dtype=np.float64)[None, :]
+
+    troops = np.broadcast_to(start, (offense.shape[0], start.shape[1])).copy()
+    plain = start.copy()
+    damage = np.zeros_like(troops)
+    baseline = np.zeros_like(plain)
+    for _ in range(rounds):
+        damage += troops * troop_damage * offense
+        baseline += plain * troop_damage
+        troops = np.maximum(troops - losses, 0)
+        plain = np.maximum(plain - bear_damage / troop_health, 0)
+    return {
+        'damage': damage,
+        'survivors': troops,
+        'baseline': np.broadcast_to(baseline, damage.shape),
+    }
+
+
+def simulate_rally(captain_heroes, joiners, troop_counts=DEFAULT_TROOPS, **params):
+    """One rally: ({stat: multiplier}, {'damage', 'survivors', 'baseline': (troop counts,)})"""
+    stats = rally_stats([captain_heroes], [joiners])
+    grid = simulate_damage(stats, troop_counts, **params)
+    return {stat: float(value[0]) for stat, value in stats.items()}, {key: value[0] for key, value in grid.items()}
+
+
+def parse_simulate_query(text):
+    """Split `!rally simulate` text into the rally spec and simulate_rally options"""
+    options = {}
+    parts = re.split(r"(?:^|\s+)(" + "|".join(SIMULATE_KEYS) + r")=(\S*)", text or "", flags=re.IGNORECASE)
+    spec = " ".join(part.strip() for part in parts[::3] if part.strip())
+    for key, value in zip(parts[1::3], parts[2::3]):
+        key = key.lower()
+        if key == "troops":
+            counts = value.replace("_", "").lower().split(",")
+            try:
+                troops = [int(float(count[:-1]) * 1000) if count.endswith("k") else int(count) for count in counts if count]
+            except ValueError:
+                raise ValueError(f"troops must be numbers like `50000,100k`, got `{value}`")
+            if not 1 <= len(troops) <= MAX_TROOP_COUNTS or not all(1 <= count <= MAX_TROOPS for count in troops):
+                raise ValueError(f"Give 1-{MAX_TROOP_COUNTS} troop counts between 1 and {MAX_TROOPS:,}")
+            options['troop_counts'] = troops
+        elif key == "rounds":
+            if not value.isdigit() or not 1 <= int(value) <= 100:
+                raise ValueError("rounds must be between 1 and 100")
+            options['rounds'] = int(value)
+    return spec, options
+
+
+def simulation_embed(text, captain):
+    """Embed for `!rally simulate`; raises ValueError with a user-facing message"""
+    spec, options = parse_simulate_query(text)
+    captain_heroes, joiners = parse_rally_spec(spec)
+    troop_counts = options.pop('troop_counts', DEFAULT_TROOPS)
+    stats, grid = simulate_rally(captain_heroes, joiners, troop_counts, **options)
+    largest = int(np.argmax(troop_counts))
+    gain = grid['damage'][largest] / grid['baseline'][largest]
+    return templates.SIMULATION.render(
+        captain=captain,
+        stats="".join(f"\n  • {STAT_NAMES[stat]}: x{value:.3f}" for stat, value in stats.items()),
+        rounds=options.get('rounds', ROUNDS),
+        troops="".join(
+            f"\n**{count:,} troops:** {damage:,.0f} damage (x{damage / base:.2f} vs no skills), {survivors:,.0f} standing"
+            for count, damage, base, survivors in zip(troop_counts, grid['damage'], grid['baseline'], grid['survivors'])
+        ),
+        gain=f"{gain:.2f}",
+    )
@@ -0,0 +1,174 @@
+"""Load generator: thousands of simulated users clicking through !rally at once.
+
+Every user walks the same complete rally as bench_wizard.py, starting at a
+random point within the ramp-up window and pausing between clicks for an
+exponentially distributed think time. Responses wait `--api-latency` as if
+they went to Discord. While the users run, the tool samples:
+- event-loop lag (how late a short periodic sleep wakes up)
+- per-click callback latency (p50 / p99 / max)
+- resident memory (RSS) growth over the idle baseline
+- live discord.ui.View objects (the wizard screens are stopped views that
+  py-cord never stores, so this should stay near the number of clicks in
+  flight)
+
+    python bench_load.py --users 2000 --think 2 --ramp 10
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import resource
+import time
+
+import discord
+
+from bench_wizard import rally_script
+from fake_discord import FakeUser, WizardDriver
+from rally_views import RallyCalculatorView
+
+LAG_INTERVAL = 0.05
+SAMPLE_INTERVAL = 1.0
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc isn't available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def live_views():
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, discord.ui.View))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.lags = []
+        self.rss = []
+        self.views = []
+        self.completed = 0
+        self.failed = 0
+        self.active = 0
+        self.peak_active = 0
+
+
+async def simulate_user(user_id, args, stats, entry_view, rng):
+    driver = WizardDriver(FakeUser(user_id, f"Captain {user_id}"), args.api_latency, entry_view)
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    stats.active += 1
+    stats.peak_active = max(stats.peak_active, stats.active)
+    try:
+        for action, value in rally_script():
+            await asyncio.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+            start = time.perf_counter()
+            if action is None:
+                await driver.start()
+            else:
+                await driver.click(action, value)
+            stats.latencies.append(time.perf_counter() - start)
+        stats.completed += 1
+    except Exception as e:
+        stats.failed += 1
+        print(f"❌ User {user_id} failed: {e}")
+    finally:
+        stats.active -= 1
+
+
+async def sample_lag(stats):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        stats.lags.append(max(0.0, loop.time() - start - LAG_INTERVAL))
+
+
+async def sample_resources(stats, count_views):
+    while True:
+        stats.rss.append(rss_bytes())
+        if count_views:
+            stats.views.append(live_views())
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    stats = LoadStats()
+    entry_view = RallyCalculatorView()
+    gc.collect()
+    baseline_rss = rss_bytes()
+    baseline_views = live_views()
+
+    samplers = [
+        asyncio.create_task(sample_lag(stats)),
+        asyncio.create_task(sample_resources(stats, not args.no_view_count)),
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(simulate_user(i, args, stats, entry_view, rng) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+    for task in samplers:
+        task.cancel()
+
+    gc.collect()
+    return stats, {
+        'elapsed': elapsed,
+        'baseline_rss': baseline_rss,
+        'final_rss': rss_bytes(),
+        'baseline_views': baseline_views,
+        'final_views': live_views(),
+    }
+
+
+def print_report(args, stats, totals):
+    latencies = sorted(stats.latencies)
+    lags = sorted(stats.lags)
+    mib = 1024 * 1024
+    print(f"🐻 {args.users} users, think {args.think}s, ramp {args.ramp}s, API latency {args.api_latency * 1000:.0f}ms")
+    print(f"✅ Rallies completed: {stats.completed} ({stats.failed} failed) in {totals['elapsed']:.1f}s")
+    print(f"👥 Peak concurrent rallies: {stats.peak_active}")
+    print(f"🖱️ Clicks: {len(latencies)} ({len(latencies) / totals['elapsed']:.0f}/s)")
+    print(
+        f"⏱️ Callback latency: p50 {percentile(latencies, 0.5) * 1000:.2f}ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms, max {latencies[-1] * 1000 if latencies else 0:.2f}ms"
+    )
+    print(
+        f"🔁 Event-loop lag: p50 {percentile(lags, 0.5) * 1000:.2f}ms, "
+        f"p99 {percentile(lags, 0.99) * 1000:.2f}ms, max {lags[-1] * 1000 if lags else 0:.2f}ms"
+    )
+    peak_rss = max(stats.rss, default=totals['final_rss'])
+    print(
+        f"💾 RSS: baseline {totals['baseline_rss'] / mib:.1f} MiB, peak +{(peak_rss - totals['baseline_rss']) / mib:.1f} MiB, "
+        f"after run +{(totals['final_rss'] - totals['baseline_rss']) / mib:.1f} MiB"
+    )
+    if stats.views:
+        print(
+            f"🧩 Live ui.View objects: baseline {totals['baseline_views']}, peak {max(stats.views)}, "
+            f"after run {totals['final_views']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between a user's clicks")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which users arrive")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="simulated Discord round trip in seconds")
+    parser.add_argument("--seed", type=int, default=272)
+    parser.add_argument("--no-view-count", action="store_true", help="skip the gc scan that counts views")
+    args = parser.parse_args()
+
+    stats, totals = asyncio.run(run(args))
+    print_report(args, stats, totals)
+
+
+if __name__ == "__main__":
+    main()
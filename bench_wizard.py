@@ -0,0 +1,146 @@
+"""Offline benchmark of the rally wizard, no Discord token needed.
+
+Walks complete rallies (start button -> hero count -> 3 captain heroes ->
+member count -> 4 members -> new rally) through the real views and
+handlers with fake_discord interactions, then reports per step:
+- CPU time per click (time.process_time, measured without tracemalloc)
+- peak and retained memory per click (tracemalloc, in a second pass)
+- Discord API calls per completed rally
+- JSON bytes of the message edit each click sends (embed plus components)
+
+    python bench_wizard.py --rallies 500
+    python bench_wizard.py --json > wizard-bench.json
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from fake_discord import FakeUser, WizardDriver
+from rally_views import ROUTES
+
+CAPTAIN = [("Chenko", "Stand of Arms", "5"), ("Amadeus", "Battle Ready", "4"), ("Jabel", "Rally Flag", "2")]
+MEMBERS = [("Fahd", "5"), ("Saul", "3"), ("Chenko", "2"), ("Amane", "1")]
+
+
+def rally_script():
+    """(action, value) clicks for one complete rally; action None is the start button"""
+    script = [(None, None), ("hc", str(len(CAPTAIN)))]
+    for hero, skill, level in CAPTAIN:
+        script += [("ch", hero), ("cs", f"{hero}|{skill}"), ("cl", level)]
+    script.append(("jc", str(len(MEMBERS))))
+    for hero, level in MEMBERS:
+        script += [("jh", hero), ("jl", level)]
+    script.append(("new", None))
+    return script
+
+
+def step_name(action):
+    return "start_setup_callback" if action is None else ROUTES[action].__name__
+
+
+async def _click(driver, action, value):
+    if action is None:
+        await driver.start()
+    else:
+        await driver.click(action, value)
+
+
+async def cpu_pass(rallies):
+    """Per-step CPU seconds and payload bytes over `rallies` rallies, plus API calls per rally"""
+    cpu = {}
+    payload = {}
+    api_calls = 0
+    script = rally_script()
+    for i in range(rallies):
+        driver = WizardDriver(FakeUser(i, f"Captain {i}"))
+        for action, value in script:
+            start = time.process_time()
+            await _click(driver, action, value)
+            elapsed = time.process_time() - start
+            name = step_name(action)
+            total, count = cpu.get(name, (0.0, 0))
+            cpu[name] = (total + elapsed, count + 1)
+            payload[name] = payload.get(name, 0) + driver.message.payload_bytes
+        api_calls += driver.api_calls
+    return cpu, payload, api_calls / rallies
+
+
+async def memory_pass(rallies):
+    """Per-step peak and retained bytes, traced with tracemalloc"""
+    memory = {}
+    script = rally_script()
+    tracemalloc.start()
+    try:
+        for i in range(rallies):
+            driver = WizardDriver(FakeUser(i, f"Captain {i}"))
+            for action, value in script:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                await _click(driver, action, value)
+                after, peak = tracemalloc.get_traced_memory()
+                name = step_name(action)
+                peak_total, retained_total, count = memory.get(name, (0, 0, 0))
+                memory[name] = (peak_total + peak - before, retained_total + after - before, count + 1)
+    finally:
+        tracemalloc.stop()
+    return memory
+
+
+async def run(rallies, memory_rallies):
+    # One warm-up rally so imports and first-use caches don't skew step 1
+    await cpu_pass(1)
+    cpu, payload, api_calls = await cpu_pass(rallies)
+    memory = await memory_pass(memory_rallies)
+
+    steps = []
+    for name, (total, count) in cpu.items():
+        peak_total, retained_total, memory_count = memory[name]
+        steps.append({
+            'step': name,
+            'clicks': count,
+            'cpu_us': total / count * 1e6,
+            'payload_bytes': payload[name] / count,
+            'peak_bytes': peak_total / memory_count,
+            'retained_bytes': retained_total / memory_count,
+        })
+    return {
+        'rallies': rallies,
+        'clicks_per_rally': len(rally_script()),
+        'cpu_ms_per_rally': sum(total for total, _ in cpu.values()) / rallies * 1000,
+        'api_calls_per_rally': api_calls,
+        'payload_bytes_per_rally': sum(payload.values()) / rallies,
+        'steps': steps,
+    }
+
+
+def print_report(report):
+    print(f"🐻 Rally wizard benchmark: {report['rallies']} rallies, {report['clicks_per_rally']} clicks each")
+    print(f"{'step':<26}{'clicks':>8}{'cpu µs':>10}{'payload B':>11}{'peak KiB':>10}{'kept B':>9}")
+    for step in report['steps']:
+        print(
+            f"{step['step']:<26}{step['clicks']:>8}{step['cpu_us']:>10.1f}{step['payload_bytes']:>11.0f}"
+            f"{step['peak_bytes'] / 1024:>10.1f}{step['retained_bytes']:>9.0f}"
+        )
+    print(f"⏱️ CPU per rally: {report['cpu_ms_per_rally']:.2f} ms")
+    print(f"📡 API calls per rally: {report['api_calls_per_rally']:.1f}")
+    print(f"📦 Payload per rally: {report['payload_bytes_per_rally'] / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rallies", type=int, default=200, help="rallies for the CPU pass")
+    parser.add_argument("--memory-rallies", type=int, default=20, help="rallies for the tracemalloc pass")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rallies, args.memory_rallies))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Monte Carlo rally bonus for chance-based skills.
+
+    !rally chance Amadeus:Unrighteous Strike:5 Saul:Trial by Fire:4 | Fahd:5 trials=1000000 proc=30
+
+The calculator adds every skill's percentage as if it always applies, but
+"... Chance Up/Down" skills only fire on some hits. Here each chance skill
+fires with probability `proc` (percent, PROC_CHANCE by default, since the
+hero data lists the bonus but not the odds) and adds its full value when
+it does. Chance skills with the same effect don't stack: a trial applies
+the best one that fired, matching the calculator's note about chance
+skills. Everything else (the captain's other skills and the counted top 4
+joiners) is fixed.
+
+Trials are drawn in chunks of CHUNK_TRIALS with NumPy: one uniform matrix
+per chunk, compared against the proc chances, per-effect maxima over the
+fired values. Totals are whole percentages, so each chunk is reduced to a
+bincount and memory stays flat however many trials are asked for; the
+mean and percentiles are read off the combined histogram.
+`!rally chance` runs it in the worker pool (workers.py), where it stops
+at its time budget with the trials done so far; only hero_data, the
+engine and NumPy are imported so pool workers never load discord.
+"""
+import re
+import time
+
+import numpy as np
+
+from hero_data import HERO_SKILLS
+from rally_engine import calculate_rally
+
+DEFAULT_TRIALS = 1_000_000
+MAX_TRIALS = 10_000_000
+CHUNK_TRIALS = 250_000
+PROC_CHANCE = 50.0  # percent
+DEFAULT_TIME_BUDGET = 5.0
+
+CHANCE_KEYS = ("trials", "proc", "seed")
+
+
+def is_chance(effect_name):
+    return "Chance" in effect_name
+
+
+def chance_skills(captain_heroes, counted_joiners):
+    """[(hero, skill, effect name, value)] of the chance skills in play"""
+    skills = []
+    for entry in list(captain_heroes) + list(counted_joiners):
+        effect = HERO_SKILLS[entry['hero']][entry['skill']]['effect']
+        if is_chance(effect):
+            skills.append((entry['hero'], entry['skill'], effect, entry['effect']))
+    return skills
+
+
+def percentile(counts, q):
+    """q-th percentile (0-100) of a bincount histogram, nearest rank"""
+    cumulative = np.cumsum(counts)
+    rank = max(1, int(np.ceil(q / 100 * cumulative[-1])))
+    return int(np.searchsorted(cumulative, rank))
+
+
+def simulate_chances(captain_heroes, joiners, trials=DEFAULT_TRIALS, proc=PROC_CHANCE, seed=None,
+                     time_budget=DEFAULT_TIME_BUDGET):
+    """Sample the rally bonus with chance skills rolled per trial.
+
+    Returns a dict with the calculator's 'nominal' total, the 'fixed' part
+    no roll can change, the chance 'skills' in play, 'trials' run, 'mean',
+    'p10', 'p50', 'p90', 'min', 'max' and whether all trials finished
+    ('complete').
+    """
+    deadline = time.perf_counter() + time_budget
+    if not 1 <= trials <= MAX_TRIALS:
+        raise ValueError(f"trials must be between 1 and {MAX_TRIALS:,}")
+    if not 0 <= proc <= 100:
+        raise ValueError("proc must be a percentage between 0 and 100")
+
+    result = calculate_rally(captain_heroes, joiners)
+    skills = chance_skills(captain_heroes, result['counted'])
+    fixed = result['total'] - sum(value for _, _, _, value in skills)
+
+    values = np.array([value for _, _, _, value in skills], dtype=np.int64)
+    # Column indices per effect: chance skills with the same effect don't stack
+    effects = sorted({effect for _, _, effect, _ in skills})
+    groups = [np.array([i for i, skill in enumerate(skills) if skill[2] == effect]) for effect in effects]
+    counts = np.zeros(values.sum() + 1, dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    done = 0
+    while done < trials and (done == 0 or time.perf_counter() < deadline):
+        n = min(CHUNK_TRIALS, trials - done)
+        if not len(skills):
+            counts[0] += n
+        else:
+            fired = np.where(rng.random((n, len(skills))) < proc / 100, values, 0)
+            bonus = sum(fired[:, group].max(axis=1) for group in groups)
+            counts += np.bincount(bonus, minlength=len(counts))
+        done += n
+
+    levels = np.arange(len(counts))
+    seen = np.flatnonzero(counts)
+    return {
+        'nominal': result['total'],
+        'fixed': fixed,
+        'skills': skills,
+        'proc': proc,
+        'trials': done,
+        'mean': fixed + float((levels * counts).sum() / done),
+        'p10': fixed + percentile(counts, 10),
+        'p50': fixed + percentile(counts, 50),
+        'p90': fixed + percentile(counts, 90),
+        'min': fixed + int(seen[0]),
+        'max': fixed + int(seen[-1]),
+        'complete': done == trials,
+    }
+
+
+def parse_chance_query(text):
+    """Split `!rally chance` text into the rally spec and simulate_chances options"""
+    options = {}
+    parts = re.split(r"(?:^|\s+)(" + "|".join(CHANCE_KEYS) + r")=(\S*)", text or "", flags=re.IGNORECASE)
+    spec = " ".join(part.strip() for part in parts[::3] if part.strip())
+    for key, value in zip(parts[1::3], parts[2::3]):
+        key = key.lower()
+        try:
+            if key == "trials":
+                options['trials'] = int(value.replace(",", "").replace("_", ""))
+            elif key == "proc":
+                options['proc'] = float(value.rstrip("%"))
+            elif key == "seed":
+                options['seed'] = int(value)
+        except ValueError:
+            raise ValueError(f"{key} must be a number, got `{value}`")
+    return spec, options
+
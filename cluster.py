@@ -0,0 +1,213 @@
+"""Opt-in cluster mode: split the bot's shards across worker processes.
+
+    RALLY_CLUSTER_WORKERS=4 python cluster.py
+
+The coordinator (this process) asks Discord for the recommended shard
+count (or uses RALLY_SHARD_COUNT), deals the shards out round-robin and
+starts one worker per slice. Each worker imports main.py as an
+AutoShardedBot limited to its shard ids and, instead of binding the
+keep-alive port, sends a health/metrics report to the coordinator over a
+multiprocessing queue every few seconds.
+
+The coordinator serves the usual keep-alive routes on port 8080 for the
+whole cluster: /health is OK while every worker process is alive,
+/metrics merges every worker's metrics under a `worker` label, and dead
+workers are restarted.
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+
+import aiohttp
+from aiohttp import web
+
+import keep_alive
+import metrics
+
+WORKERS = int(os.getenv("RALLY_CLUSTER_WORKERS", "2"))
+REPORT_INTERVAL = 5  # seconds between worker reports
+STALE_AFTER = 30  # a worker that hasn't reported for this long is shown as stale
+IDENTIFY_DELAY = 5.5  # Discord allows one shard IDENTIFY every 5 seconds
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+WORKER_UP = metrics.Gauge("cluster_worker_up", "1 if the worker process is alive", ["worker"])
+WORKER_REPORT_AGE = metrics.Gauge(
+    "cluster_worker_report_age_seconds", "Seconds since the worker's last report", ["worker"]
+)
+WORKER_RESTARTS = metrics.Counter("cluster_worker_restarts", "Worker processes restarted after exiting", ["worker"])
+CLUSTER_FAMILIES = ("cluster_worker_up", "cluster_worker_report_age_seconds", "cluster_worker_restarts")
+
+
+def split_shards(shard_count, workers):
+    """Round-robin shard ids per worker, dropping workers with nothing to run"""
+    return [shards for shards in (list(range(i, shard_count, workers)) for i in range(workers)) if shards]
+
+
+async def recommended_shards(token):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())['shards']
+
+
+# Worker side
+
+async def report_health(bot, worker_id, shard_ids, reports):
+    """Send this worker's health and metrics to the coordinator"""
+    while True:
+        reports.put({
+            'worker': worker_id,
+            'shards': shard_ids,
+            'ready': bot.is_ready(),
+            'latency': bot.latency,
+            'guilds': len(bot.guilds),
+            'metrics': metrics.collect(),
+            'sent': time.time(),
+        })
+        await asyncio.sleep(REPORT_INTERVAL)
+
+
+def worker_main(worker_id, shard_ids, shard_count, reports, start_delay):
+    # Stagger workers so their shards don't IDENTIFY at the same time
+    time.sleep(start_delay)
+    os.environ["RALLY_CLUSTER_WORKER"] = str(worker_id)
+    os.environ["RALLY_SHARD_COUNT"] = str(shard_count)
+    os.environ["RALLY_SHARD_IDS"] = ",".join(map(str, shard_ids))
+
+    import main
+    main.bot.cluster_reporter = main.bot.loop.create_task(report_health(main.bot, worker_id, shard_ids, reports))
+    print(f"🧩 Worker {worker_id} starting shards {shard_ids} of {shard_count}")
+    try:
+        main.bot.run(main.BOT_TOKEN)
+    finally:
+        main.workers.shutdown()
+
+
+# Coordinator side
+
+class Coordinator:
+    def __init__(self, shard_count, workers=WORKERS):
+        self.shard_count = shard_count
+        self.slices = split_shards(shard_count, workers)
+        self.context = multiprocessing.get_context("spawn")
+        self.reports = self.context.Queue()
+        self.processes = {}
+        self.latest = {}  # worker id -> last report
+        self.target = worker_main
+
+    def start_worker(self, worker_id, start_delay=0):
+        process = self.context.Process(
+            target=self.target,
+            args=(worker_id, self.slices[worker_id], self.shard_count, self.reports, start_delay),
+            name=f"rally-worker-{worker_id}",
+            # Not daemonic: daemonic processes can't start the job pool (workers.py);
+            # stop() terminates and joins them instead
+            daemon=False,
+        )
+        process.start()
+        self.processes[worker_id] = process
+
+    def start(self):
+        delay = 0
+        for worker_id, shards in enumerate(self.slices):
+            self.start_worker(worker_id, delay)
+            delay += len(shards) * IDENTIFY_DELAY
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    async def collect_reports(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Short timeout so the executor thread never outlives shutdown for long
+                report = await loop.run_in_executor(None, self.reports.get, True, 1)
+            except queue.Empty:
+                continue
+            self.latest[report['worker']] = report
+
+    async def supervise(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            for worker_id, process in list(self.processes.items()):
+                if not process.is_alive():
+                    print(f"⚠️ Worker {worker_id} exited ({process.exitcode}), restarting")
+                    WORKER_RESTARTS.inc(worker=worker_id)
+                    self.start_worker(worker_id)
+
+    def worker_lines(self):
+        now = time.time()
+        healthy = True
+        lines = []
+        for worker_id, process in self.processes.items():
+            alive = process.is_alive()
+            healthy &= alive
+            report = self.latest.get(worker_id)
+            age = now - report['sent'] if report else float('inf')
+            WORKER_UP.set(int(alive), worker=worker_id)
+            WORKER_REPORT_AGE.set(age, worker=worker_id)
+            if report is None:
+                state = "starting"
+            elif age > STALE_AFTER:
+                state = f"stale ({age:.0f}s)"
+            elif report['ready']:
+                state = f"ready, {report['guilds']} guilds, {report['latency'] * 1000:.0f}ms"
+            else:
+                state = "connecting"
+            lines.append(f"worker {worker_id} shards {self.slices[worker_id]}: {'up' if alive else 'down'}, {state}")
+        return healthy, lines
+
+    async def health(self, request):
+        healthy, lines = self.worker_lines()
+        return web.Response(text="\n".join(["OK" if healthy else "DEGRADED"] + lines), status=200 if healthy else 503)
+
+    async def metrics_endpoint(self, request):
+        self.worker_lines()  # refresh the cluster gauges
+        families = metrics.merge({worker_id: report['metrics'] for worker_id, report in self.latest.items()})
+        families += [family for family in metrics.collect() if family[0] in CLUSTER_FAMILIES]
+        return web.Response(text=metrics.render(families), content_type='text/plain')
+
+    async def run(self):
+        app = web.Application()
+        app.router.add_get('/', keep_alive.home)
+        app.router.add_get('/ping', keep_alive.ping)
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/metrics', self.metrics_endpoint)
+        await keep_alive.run(app)
+        self.start()
+        await asyncio.gather(self.collect_reports(), self.supervise(), keep_alive.self_ping())
+
+
+def main():
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        print("❌ Error: DISCORD_TOKEN environment variable not set!")
+        exit(1)
+
+    shard_count = os.getenv("RALLY_SHARD_COUNT")
+    shard_count = int(shard_count) if shard_count else asyncio.run(recommended_shards(token))
+
+    # Build the lookup table once here, so workers only memory-map it
+    from rally_table import get_table
+    get_table()
+
+    coordinator = Coordinator(shard_count)
+    print(f"🚀 Starting cluster: {shard_count} shards over {len(coordinator.slices)} workers")
+    try:
+        asyncio.run(coordinator.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        coordinator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Rate-limit-aware dispatcher for outbound message edits.
+
+Anything that edits a message it already sent (live summaries, status
+boards) goes through `EDITS.submit(message, embed=..., view=...)` instead of
+awaiting `message.edit()` directly. Per message the dispatcher:
+- keeps one pending edit; a newer submit is merged into it (newer fields
+  win), so a burst of updates becomes one edit with the latest state
+- waits for both the message's and its channel's bucket (a window of
+  `limit` edits per `per` seconds, like Discord's) before sending
+- skips edits whose serialised payload matches the last one it sent
+- on a 429, blocks the bucket for the retry-after Discord reported and
+  sends the (possibly further merged) edit again
+
+A field may also be a function of no arguments, such as a render
+callback; it is called only when the edit is about to be sent, so a burst
+merged into one edit renders once, from the latest state.
+
+`submit()` returns a future for the outcome: "sent", "unchanged" or
+"failed" (errors other than 429 are printed, not raised). Every submitter
+whose edit was merged shares the outcome of the edit that carried it.
+
+Interaction responses (the wizard's edit_message) answer a per-interaction
+token and don't go through here.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+
+import discord
+
+from metrics import MESSAGE_EDITS, MESSAGE_EDIT_WAIT_SECONDS
+
+# Discord allows about 5 message edits per 5 seconds in a channel
+CHANNEL_LIMIT = (5, 5.0)
+MESSAGE_LIMIT = (5, 5.0)
+MAX_BUCKETS = 1000  # idle buckets and fingerprints kept before the oldest are dropped
+
+
+class Bucket:
+    """At most `limit` uses in any `per`-second window, plus 429 blocks"""
+    __slots__ = ('limit', 'per', 'uses', 'blocked_until')
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.uses = deque()
+        self.blocked_until = 0.0
+
+    def delay(self, now):
+        """Seconds until one more use fits"""
+        while self.uses and self.uses[0] <= now - self.per:
+            self.uses.popleft()
+        wait = self.blocked_until - now
+        if len(self.uses) >= self.limit:
+            wait = max(wait, self.uses[0] + self.per - now)
+        return max(wait, 0.0)
+
+    def use(self, now):
+        self.uses.append(now)
+
+    def block(self, until):
+        self.blocked_until = max(self.blocked_until, until)
+
+
+def payload_fingerprint(fields):
+    """Serialised form of edit fields, for spotting edits that change nothing"""
+    serialised = {}
+    for name, value in fields.items():
+        if isinstance(value, discord.Embed):
+            value = value.to_dict()
+        elif isinstance(value, discord.ui.View):
+            value = value.to_components()
+        elif isinstance(value, (list, tuple)):
+            value = [item.to_dict() if isinstance(item, discord.Embed) else item for item in value]
+        serialised[name] = value
+    return json.dumps(serialised, sort_keys=True, default=str)
+
+
+def retry_after(error, default):
+    """Retry delay from a 429 HTTPException's Retry-After header"""
+    headers = getattr(error.response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After', default))
+    except (TypeError, ValueError):
+        return default
+
+
+class _PendingEdit:
+    __slots__ = ('message', 'fields', 'waiters', 'queued_at')
+
+    def __init__(self, message, queued_at):
+        self.message = message
+        self.fields = {}
+        self.waiters = []
+        self.queued_at = queued_at
+
+
+def _lru_get(store, key, factory):
+    value = store.get(key)
+    if value is None:
+        value = store[key] = factory()
+        if len(store) > MAX_BUCKETS:
+            store.popitem(last=False)
+    else:
+        store.move_to_end(key)
+    return value
+
+
+class EditDispatcher:
+    def __init__(self, channel_limit=CHANNEL_LIMIT, message_limit=MESSAGE_LIMIT, clock=time.monotonic):
+        self.channel_limit = channel_limit
+        self.message_limit = message_limit
+        self.clock = clock
+        self.channels = OrderedDict()  # channel id -> Bucket
+        self.messages = OrderedDict()  # (channel id, message id) -> Bucket
+        self.sent = OrderedDict()  # (channel id, message id) -> fingerprint of the last sent edit
+        self.pending = {}  # (channel id, message id) -> _PendingEdit
+        self._tasks = {}
+
+    @staticmethod
+    def key(message):
+        return message.channel.id, message.id
+
+    def submit(self, message, **fields):
+        """Queue an edit of `message`; returns a future for its outcome"""
+        key = self.key(message)
+        future = asyncio.get_running_loop().create_future()
+        edit = self.pending.get(key)
+        if edit is None:
+            edit = self.pending[key] = _PendingEdit(message, self.clock())
+        elif edit.fields:
+            MESSAGE_EDITS.inc(outcome="merged")
+        edit.message = message
+        edit.fields.update(fields)
+        edit.waiters.append(future)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._drain(key))
+        return future
+
+    async def _wait_for_buckets(self, key):
+        """Wait until both buckets have room; returns them (the caller records the use)"""
+        channel = _lru_get(self.channels, key[0], lambda: Bucket(*self.channel_limit))
+        message = _lru_get(self.messages, key, lambda: Bucket(*self.message_limit))
+        while True:
+            delay = max(channel.delay(self.clock()), message.delay(self.clock()))
+            if delay <= 0:
+                return channel, message
+            await asyncio.sleep(delay)
+
+    def _skip_unchanged(self, key, fingerprint):
+        if self.sent.get(key) != fingerprint:
+            return False
+        MESSAGE_EDITS.inc(outcome="unchanged")
+        _resolve(self.pending.pop(key).waiters, "unchanged")
+        return True
+
+    async def _drain(self, key):
+        try:
+            while key in self.pending:
+                # Unchanged edits are dropped before they spend a bucket slot (rendered ones once sent)
+                fields = self.pending[key].fields
+                if not _deferred(fields) and self._skip_unchanged(key, payload_fingerprint(fields)):
+                    continue
+                channel, bucket = await self._wait_for_buckets(key)
+                # Whatever is pending now, including edits merged while waiting
+                try:
+                    fields = _rendered(self.pending[key].fields)
+                except Exception as e:
+                    MESSAGE_EDITS.inc(outcome="failed")
+                    print(f"⚠️ Rendering a message edit failed: {e}")
+                    _resolve(self.pending.pop(key).waiters, "failed")
+                    continue
+                fingerprint = payload_fingerprint(fields)
+                if self._skip_unchanged(key, fingerprint):
+                    continue
+                edit = self.pending.pop(key)
+                now = self.clock()
+                MESSAGE_EDIT_WAIT_SECONDS.observe(now - edit.queued_at)
+                channel.use(now)
+                bucket.use(now)
+                try:
+                    await edit.message.edit(**fields)
+                except Exception as e:
+                    if not (isinstance(e, discord.HTTPException) and e.status == 429):
+                        MESSAGE_EDITS.inc(outcome="failed")
+                        print(f"⚠️ Message edit failed: {e}")
+                        _resolve(edit.waiters, "failed")
+                        continue
+                    MESSAGE_EDITS.inc(outcome="rate_limited")
+                    # Block the channel too; we can't tell which bucket Discord hit
+                    until = self.clock() + retry_after(e, bucket.per)
+                    bucket.block(until)
+                    channel.block(until)
+                    self._requeue(key, edit)
+                    continue
+                MESSAGE_EDITS.inc(outcome="sent")
+                self.sent[key] = fingerprint
+                self.sent.move_to_end(key)
+                if len(self.sent) > MAX_BUCKETS:
+                    self.sent.popitem(last=False)
+                _resolve(edit.waiters, "sent")
+        finally:
+            del self._tasks[key]
+
+    def _requeue(self, key, edit):
+        """Put a rate-limited edit back, under any edit submitted since"""
+        newer = self.pending.get(key)
+        if newer is not None:
+            edit.fields.update(newer.fields)
+            edit.waiters += newer.waiters
+            edit.message = newer.message
+        self.pending[key] = edit
+
+    def stats(self):
+        return {'pending': len(self.pending), 'channels': len(self.channels), 'messages': len(self.messages)}
+
+
+def _deferred(fields):
+    return any(callable(value) for value in fields.values())
+
+
+def _rendered(fields):
+    """Fields with render callbacks replaced by what they return"""
+    return {name: value() if callable(value) else value for name, value in fields.items()}
+
+
+def _resolve(waiters, outcome):
+    for future in waiters:
+        if not future.done():
+            future.set_result(outcome)
+
+
+# Shared by everything that edits messages on this bot's event loop
+EDITS = EditDispatcher()
@@ -0,0 +1,278 @@
+"""Precompiled embed templates for the rally wizard and summaries.
+
+Every wizard and summary embed is declared once here. The title and colour
+(as a ready discord.Colour) are fixed at import, static descriptions are
+plain strings, and variable descriptions are f-string functions, so
+rendering one is a single compiled format of only the variable fields.
+Repeated rows (configured heroes, members, effects) carry their own leading
+newline and are joined once; there are no intermediate lists of lines.
+
+Each render records the embed's size in characters (what Discord's 6000
+limit counts) in the rally_embed_payload_chars histogram while
+instrumentation is on. payload_size() gives the exact JSON bytes py-cord
+sends, for benchmarks and debugging.
+"""
+import json
+
+import discord
+
+import instrumentation
+from metrics import EMBED_PAYLOAD_CHARS
+
+BLUE = 0x0099ff
+GREEN = 0x00ff00
+EXCLUDED_SHOWN = 15  # excluded members listed by name before "...and N more"
+
+
+def payload_size(embed):
+    """Bytes of JSON py-cord sends for `embed` (compact separators, ASCII escapes)"""
+    return len(json.dumps(embed.to_dict(), separators=(",", ":"), ensure_ascii=True))
+
+
+class EmbedTemplate:
+    __slots__ = ('name', 'title', 'colour', 'describe')
+
+    def __init__(self, name, title, describe, color=BLUE):
+        self.name = name
+        self.title = title
+        self.colour = discord.Colour(color)
+        # A str for static embeds, otherwise a function of the variable fields
+        self.describe = describe
+
+    def render(self, color=None, **fields):
+        description = self.describe(**fields) if fields else self.describe
+        if instrumentation.ENABLED:
+            EMBED_PAYLOAD_CHARS.observe(len(self.title) + len(description), template=self.name)
+        colour = self.colour if color is None else color
+        return discord.Embed(title=self.title, description=description, colour=colour)
+
+
+# Repeated rows, each starting with its own newline
+
+def entry_lines(entries, label):
+    return "".join(
+        f"\n✅ **{label} {i}:** {e['hero']} - {e['skill']} (+{e['effect']}%)" for i, e in enumerate(entries, 1)
+    )
+
+
+def captain_hero_lines(entries, indent=""):
+    return "".join(f"\n{indent}**Hero {i}:** {e['hero']} - {e['skill']} (+{e['effect']}%)" for i, e in enumerate(entries, 1))
+
+
+def effect_lines(effects):
+    return "".join(f"\n  • {effect}: +{value}%" for effect, value in effects.items())
+
+
+# Final calculation rows: rendered once per composition (rally_views.rally_summary),
+# numbered per call in the order the caller gave the entries
+
+def hero_row(e):
+    return f"{e['hero']} - {e['skill']} (+{e['effect']}%)"
+
+
+def member_row(e):
+    return f"{e['hero']} (+{e['effect']}%)"
+
+
+def result_hero_lines(rows):
+    return "".join(f"\n  **Hero {i}:** {row}" for i, row in enumerate(rows, 1))
+
+
+def top_member_lines(rows):
+    return "".join(f"\n**Top Member {i}:** {row}" for i, row in enumerate(rows, 1))
+
+
+def excluded_lines(rows, count):
+    """`count` excluded members, `rows` being the first EXCLUDED_SHOWN, so large rallies fit in one embed"""
+    if not count:
+        return ""
+    hidden = count - len(rows)
+    return (
+        f"\n\n⚠️ **Excluded Members:** {count} (only top 4 skills count)"
+        + "".join(f"\n  - {row} - Not counted" for row in rows)
+        + (f"\n  - ...and {hidden} more" if hidden > 0 else "")
+    )
+
+
+def session_member_lines(counted, excluded, hidden):
+    """Session members as (name, entry): counted ones starred, then excluded ones and how many more"""
+    return (
+        "".join(f"\n⭐ **{name}:** {e['hero']} Lv{e['level']} (+{e['effect']}%)" for name, e in counted)
+        + "".join(f"\n▫️ **{name}:** {e['hero']} Lv{e['level']} (+{e['effect']}%)" for name, e in excluded)
+        + (f"\n▫️ ...and {hidden} more" if hidden > 0 else "")
+    )
+
+
+def roster_member_lines(counted):
+    """Imported roster's counted members as (name, hero, level, effect), best first"""
+    return "".join(f"\n⭐ **{name}:** {hero} Lv{level} (+{effect}%)" for name, hero, level, effect in counted)
+
+
+def roster_captain_line(captain, captain_total, heroes):
+    if not heroes:
+        return f"\n👑 **Rally Captain:** {captain} (no heroes given, members only)"
+    return f"\n👑 **Rally Captain:** {captain} (+{captain_total}%){captain_hero_lines(heroes, indent='  ')}"
+
+
+def assigned_rally_lines(rally):
+    """One rally of `!rally assign` for an embed field: the captain's heroes, then the joiners"""
+    heroes = ", ".join(f"{hero} Lv{level}" for hero, level, _ in rally['captain_heroes'])
+    return (
+        f"👑 **{rally['captain']}:** {heroes} (+{rally['captain_total']}%)"
+        + "".join(f"\n🤝 **{name}:** {hero} Lv{level} (+{effect}%)" for name, hero, level, effect in rally['joiners'])
+    )
+
+
+def assignment_notes(optimal, balanced, invalid, errors):
+    notes = ""
+    if not optimal:
+        notes += "\n⏱️ Time ran out choosing roles, showing a greedy split"
+    elif not balanced:
+        notes += "\n⏱️ Time ran out balancing, rallies may be uneven"
+    if invalid:
+        notes += f"\n⚠️ {invalid} rows skipped" + "".join(f"\n  - {error}" for error in errors)
+    return notes
+
+
+def warning_line(warning):
+    return f"\n⚠️ {warning}" if warning else ""
+
+
+def result_tail(captain_total, size, joiner_total, total, status):
+    """Final calculation text after the member lines"""
+    return (
+        f"\n\n🎯 **Total Rally Size:** {size} members"
+        f"\n⚔️ **Active Skills:** Captain ({captain_total}%) + Top 4 Members ({joiner_total}%)"
+        f"\n\n📊 **Total Rally Bonus:** {total}% ({status})"
+        "\n📈 **Calculation Method:** Captain (additive) + Top 4 Member Skills (official rules)"
+    )
+
+
+INTRO = EmbedTemplate(
+    "intro",
+    "🐻 Bear Hunt Rally Calculator",
+    "Configure your Bear Hunt rally team for maximum effectiveness!\n\n"
+    "**Rally Mechanics (Official Guide):**\n"
+    "👑 **Rally Captain**: Select 1-3 heroes (up to 9 skills total)\n"
+    "🤝 **Rally Members**: Contribute 4 highest-level first expedition skills\n"
+    "📊 **Captain skills**: All additive within rally\n"
+    "⚠️ **Note**: Chance-based skills (like Jabel) don't stack\n"
+    "🔄 Multiplicative bonuses for hero diversity\n"
+    "📊 Color-coded optimization results"
+)
+
+CAPTAIN_SETUP = EmbedTemplate(
+    "captain_setup",
+    "🐻 Rally Captain Setup",
+    lambda captain: (
+        f"**Rally Captain:** {captain}\n\n"
+        "As Rally Captain, you can select 1-3 heroes for your squad.\n"
+        "**How many heroes do you want to bring?**"
+    )
+)
+
+CAPTAIN_SLOT = EmbedTemplate(
+    "captain_slot",
+    "🐻 Rally Captain Hero Configuration",
+    lambda captain, configured, total, entries, slot, warning: (
+        f"**Captain:** {captain}\n**Heroes Configured:** {configured}/{total}{entries}"
+        f"\n\n⚔️ Pick hero, skill and level for captain hero #{slot}:{warning}"
+    )
+)
+
+JOINER_SLOT = EmbedTemplate(
+    "joiner_slot",
+    "🐻 Rally Member Configuration",
+    lambda captain, configured, total, entries, slot, warning: (
+        f"**Rally Captain:** {captain} ✅\n**Rally Members Configured:** {configured}/{total}{entries}"
+        f"\n\n⚔️ Pick hero and first skill level for rally member #{slot}:{warning}"
+    )
+)
+
+CAPTAIN_SUMMARY = EmbedTemplate(
+    "captain_summary",
+    "🐻 Rally Captain Setup Complete!",
+    lambda captain, heroes, effects, total: (
+        f"**Rally Captain:** {captain}{heroes}{effects}"
+        f"\n\n🎯 **Captain Total Bonus:** +{total}% (additive)"
+        "\n\n✅ Captain ready! Now configure rally joiners:"
+    ),
+    GREEN
+)
+
+# The body after the captain's name comes from the rally result cache
+RALLY_RESULT = EmbedTemplate(
+    "rally_result",
+    "🧮 Bear Hunt Rally Calculation",
+    lambda captain, body: f"**Rally Captain:** {captain}{body}"
+)
+
+# Live summary of a channel rally session (rally_sessions.py)
+SESSION = EmbedTemplate(
+    "rally_session",
+    "🐻 Rally Session",
+    lambda captain, captain_total, heroes, count, limit, members, total, status, footer: (
+        f"**Rally Captain:** {captain} (+{captain_total}%){heroes}"
+        f"\n\n👥 **Members:** {count}/{limit}{members}"
+        f"\n\n📊 **Current Rally Bonus:** {total}% ({status})"
+        f"\n{footer}"
+    )
+)
+
+# Result of `!rally import` (roster_import.py)
+ROSTER_IMPORT = EmbedTemplate(
+    "roster_import",
+    "📋 Alliance Roster Import",
+    lambda filename, members, notes, captain, counted, excluded, heroes, joiner_total, total, status: (
+        f"**File:** {filename} - {members} members{notes}{captain}"
+        f"\n\n🤝 **Top 4 Members:**{counted}"
+        f"\n▫️ {excluded} more members not counted"
+        f"\n🦸 **Roster:** {heroes}"
+        f"\n\n⚔️ **Active Skills:** Captain + Top 4 Members ({joiner_total}%)"
+        f"\n📊 **Total Rally Bonus:** {total}% ({status})"
+    )
+)
+
+# `!rally assign N`; each rally is added as a field
+ASSIGNMENT = EmbedTemplate(
+    "rally_assignment",
+    "🗺️ Alliance Rally Assignment",
+    lambda filename, members, rallies, total, unassigned, notes: (
+        f"**File:** {filename} - {members} members in {rallies} rallies"
+        f"\n📊 **Alliance Total:** {total}% (captains + top 4 members per rally)"
+        f"\n▫️ {unassigned} members not needed{notes}"
+    )
+)
+
+# `!rally chance` (chance_sim.py)
+CHANCE = EmbedTemplate(
+    "rally_chance",
+    "🎲 Rally Bonus With Chance Skills",
+    lambda captain, skills, proc, trials, nominal, mean, p10, p50, p90, low, high, status, note: (
+        f"**Rally Captain:** {captain}"
+        f"\n\n🎲 **Chance skills ({proc}% proc each, same effects don't stack):**{skills}"
+        f"\n\n📋 **Calculator total:** {nominal}% (every chance skill firing)"
+        f"\n📊 **Expected bonus:** {mean}% ({status}) over {trials} trials"
+        f"\n📉 **p10 / median / p90:** {p10}% / {p50}% / {p90}%"
+        f"\n↕️ **Range:** {low}% - {high}%{note}"
+    )
+)
+
+# `!rally simulate` (bear_sim.py)
+SIMULATION = EmbedTemplate(
+    "rally_simulation",
+    "🐻 Bear Hunt Damage Simulation",
+    lambda captain, stats, rounds, troops, gain: (
+        f"**Rally Captain:** {captain}"
+        f"\n\n📐 **Stat multipliers (same hero op adds, different ops multiply):**{stats}"
+        f"\n\n⚔️ **Estimated damage over {rounds} rounds:**{troops}"
+        f"\n\n📊 **Skills multiply damage by x{gain}** at the largest troop count"
+        "\nℹ️ Illustrative units: compare rallies, not game numbers"
+    )
+)
+
+RESET = EmbedTemplate(
+    "reset",
+    "🐻 Bear Hunt Rally Calculator",
+    "Select your rally captain to begin:"
+)
@@ -0,0 +1,225 @@
+"""Offline stand-ins for the Discord objects the rally wizard touches.
+
+FakeInteraction mimics a component interaction: it carries a custom_id and
+selected values, and its response object records every call instead of
+talking to Discord. Responses are serialised the way py-cord would
+(embed.to_dict(), view.to_components(), then compact JSON), so the CPU
+cost of building a payload is still paid and its size is known.
+WizardDriver replays clicks against the components of the last message,
+which lets benchmarks walk the whole wizard with no token and no network.
+An optional `api_latency` (seconds) makes every recorded call wait as if
+it made a round trip to Discord.
+
+FakeDiscordAPI stands in for the message edit endpoint: messages created
+with it (FakeMessage(api=...)) go through Discord-style per-channel and
+per-message buckets, and an edit over the limit raises a 429
+HTTPException with a Retry-After header, as py-cord does once its own
+retries give up.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+
+import discord
+
+from rally_views import START_CUSTOM_ID, RallyCalculatorView, route_interaction
+
+DISCORD_EPOCH_MS = 1420070400000
+
+_sequence = itertools.count()
+
+# view argument left out of an edit (None removes the components, like py-cord)
+UNCHANGED = object()
+
+
+def fake_snowflake():
+    """Snowflake id stamped with the current time, like a fresh interaction"""
+    return ((int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22) | (next(_sequence) & 0x3FFFFF)
+
+
+class FakeUser:
+    def __init__(self, user_id, display_name):
+        self.id = user_id
+        self.display_name = display_name
+        self.name = display_name
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class FakeHTTPResponse:
+    """Just enough of aiohttp's response for discord.HTTPException"""
+
+    def __init__(self, status, reason, headers=None):
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+
+class FakeDiscordAPI:
+    """Message edit endpoint enforcing `limit` edits per `per` seconds per channel and per message"""
+
+    def __init__(self, channel_limit=(5, 5.0), message_limit=(5, 5.0), latency=0, clock=time.monotonic):
+        self.channel_limit = channel_limit
+        self.message_limit = message_limit
+        self.latency = latency
+        self.clock = clock
+        self.buckets = {}  # ('channel', id) / ('message', channel id, id) -> deque of edit times
+        self.edits = []  # (channel id, message id, fields) accepted, in order
+        self.rejected = 0
+
+    def _bucket(self, key, per, now):
+        uses = self.buckets.setdefault(key, deque())
+        while uses and uses[0] <= now - per:
+            uses.popleft()
+        return uses
+
+    async def edit(self, message, fields):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = self.clock()
+        limits = (
+            (('channel', message.channel.id), self.channel_limit),
+            (('message', message.channel.id, message.id), self.message_limit),
+        )
+        buckets = []
+        for key, (limit, per) in limits:
+            uses = self._bucket(key, per, now)
+            if len(uses) >= limit:
+                self.rejected += 1
+                retry = uses[0] + per - now
+                raise discord.HTTPException(
+                    FakeHTTPResponse(429, "Too Many Requests", {'Retry-After': f"{retry:.3f}"}),
+                    {'message': "You are being rate limited.", 'retry_after': retry, 'code': 0}
+                )
+            buckets.append(uses)
+        for uses in buckets:
+            uses.append(now)
+        self.edits.append((message.channel.id, message.id, fields))
+
+
+class FakeMessage:
+    """Latest payload of a message the bot sent (the wizard's, or one edited through FakeDiscordAPI)"""
+
+    def __init__(self, api=None, channel=None):
+        self.id = fake_snowflake()
+        self.channel = channel or FakeChannel(fake_snowflake())
+        self.api = api
+        self.embed = None
+        self.components = {}  # custom_id -> component dict
+        self.edits = 0
+        self.payload_bytes = 0  # size of the last edit's JSON body
+
+    def apply(self, embed=None, view=UNCHANGED):
+        payload = {}
+        if embed is not None:
+            self.embed = embed.to_dict()
+            payload['embeds'] = [self.embed]
+        if view is None:
+            payload['components'] = []
+            self.components = {}
+        elif view is not UNCHANGED:
+            payload['components'] = view.to_components()
+            self.components = {
+                component['custom_id']: component
+                for row in payload['components']
+                for component in row['components']
+            }
+        self.payload_bytes = len(json.dumps(payload, separators=(",", ":"), ensure_ascii=True))
+        self.edits += 1
+
+    async def edit(self, **fields):
+        """Message.edit through the fake API's rate limits"""
+        if self.api is not None:
+            await self.api.edit(self, dict(fields))
+        self.apply(fields.get('embed'), fields.get('view', UNCHANGED))
+
+
+class FakeResponse:
+    """InteractionResponse double that records calls"""
+
+    def __init__(self, interaction, api_latency=0):
+        self._interaction = interaction
+        self._responded = False
+        self._api_latency = api_latency
+
+    def is_done(self):
+        return self._responded
+
+    def _respond(self, kind, kwargs):
+        if self._responded:
+            raise discord.InteractionResponded(self._interaction)
+        self._responded = True
+        self._interaction.calls.append((kind, kwargs))
+
+    async def _round_trip(self):
+        if self._api_latency:
+            await asyncio.sleep(self._api_latency)
+
+    async def defer(self, **kwargs):
+        self._respond('defer', kwargs)
+        await self._round_trip()
+
+    async def send_message(self, content=None, **kwargs):
+        kwargs['content'] = content
+        self._respond('send_message', kwargs)
+        await self._round_trip()
+
+    async def edit_message(self, **kwargs):
+        self._respond('edit_message', kwargs)
+        self._interaction.message.apply(kwargs.get('embed'), kwargs.get('view', UNCHANGED))
+        await self._round_trip()
+
+
+class FakeInteraction:
+    type = discord.InteractionType.component
+
+    def __init__(self, user, message, custom_id, values=None, api_latency=0):
+        self.id = fake_snowflake()
+        self.user = user
+        self.message = message
+        self.data = {'custom_id': custom_id, 'component_type': 3 if values else 2, 'values': list(values or [])}
+        self.calls = []
+        self.response = FakeResponse(self, api_latency)
+
+    async def edit_original_response(self, **kwargs):
+        self.calls.append(('edit_original_response', kwargs))
+        self.message.apply(kwargs.get('embed'), kwargs.get('view', UNCHANGED))
+        await self.response._round_trip()
+
+
+class WizardDriver:
+    """Clicks through the wizard for one user, one message"""
+
+    def __init__(self, user, api_latency=0, entry_view=None):
+        self.user = user
+        self.api_latency = api_latency
+        self.message = FakeMessage()
+        self.api_calls = 0
+        # The bot registers one entry view at startup; pass it in to share it
+        self.entry_view = entry_view or RallyCalculatorView()
+
+    def custom_id(self, action):
+        for custom_id in self.message.components:
+            if custom_id.startswith(f"rally:{action}:"):
+                return custom_id
+        raise LookupError(f"No '{action}' component on the current screen")
+
+    async def start(self):
+        interaction = FakeInteraction(self.user, self.message, START_CUSTOM_ID, api_latency=self.api_latency)
+        await self.entry_view.start_setup_callback(interaction)
+        self.api_calls += len(interaction.calls)
+        return interaction
+
+    async def click(self, action, value=None):
+        interaction = FakeInteraction(
+            self.user, self.message, self.custom_id(action), [value] if value else None, self.api_latency
+        )
+        if not await route_interaction(interaction):
+            raise LookupError(f"'{action}' wasn't routed")
+        self.api_calls += len(interaction.calls)
+        return interaction
@@ -0,0 +1,101 @@
+"""Hero catalog shared by the bot and the rally engine"""
+
+# Hero data - Jabel included (captain can use, joiners should avoid chance-based skills)
+HEROES = ["Chenko", "Amadeus", "Yeonwoo", "Amane", "Howard", "Quinn", "Gordon", "Fahd", "Saul", "Hilde", "Eric", "Jabel"]
+
+# Hero effect operation mapping for multiplicative bonuses
+HERO_EFFECT_OPS = {
+    "Chenko": 101,
+    "Amadeus": 102, 
+    "Yeonwoo": 103,
+    "Amane": 102,  # Same op as Amadeus for multiplicative stacking
+    "Howard": 104,
+    "Quinn": 105,
+    "Gordon": 106,
+    "Fahd": 107,
+    "Saul": 108,
+    "Hilde": 109,
+    "Eric": 110,
+    "Jabel": 111
+}
+
+HERO_SKILLS = {
+    "Chenko": {
+        "Stand of Arms": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]},
+        "Shield Wall": {"effect": "Damage Taken Down", "values": [4, 8, 12, 16, 20]}
+    },
+    "Amadeus": {
+        "Battle Ready": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]},
+        "Way of the Blade": {"effect": "Attack Up", "values": [5, 10, 15, 20, 25]},
+        "Unrighteous Strike": {"effect": "Damage Dealt Chance Up", "values": [8, 16, 24, 32, 40]}
+    },
+    "Yeonwoo": {
+        "On Guard": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]},
+        "Well-Traveled": {"effect": "Increases Research Speed", "values": [3, 6, 9, 12, 15]}
+    },
+    "Amane": {
+        "Tri-Phalanx": {"effect": "Attack Up", "values": [5, 10, 15, 20, 25]},
+        "Exorcism": {"effect": "Healing Speed Up", "values": [10, 20, 30, 40, 50]}
+    },
+    "Howard": {
+        "Defenders' Edge": {"effect": "Damage Taken Down", "values": [4, 8, 12, 16, 20]},
+        "Weaken": {"effect": "Enemy Troops Attack Down", "values": [4, 8, 12, 16, 20]}
+    },
+    "Quinn": {
+        "Sixth Sense": {"effect": "Damage Taken Down", "values": [4, 8, 12, 16, 20]},
+        "Vigor": {"effect": "Health Up", "values": [5, 10, 15, 20, 25]}
+    },
+    "Gordon": {
+        "Bloodthirsty": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]},
+        "Protection": {"effect": "Damage Taken Down", "values": [4, 8, 12, 16, 20]}
+    },
+    "Fahd": {
+        "Hunter": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]},
+        "Assassinate": {"effect": "Damage Dealt Chance Up", "values": [8, 16, 24, 32, 40]}
+    },
+    "Saul": {
+        "Blade Dance": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]},
+        "Trial by Fire": {"effect": "Damage Taken Chance Down", "values": [8, 16, 24, 32, 40]}
+    },
+    "Hilde": {
+        "Iron Will": {"effect": "Damage Taken Down", "values": [4, 8, 12, 16, 20]},
+        "Overwhelm": {"effect": "Enemy Troops Attack Down", "values": [4, 8, 12, 16, 20]}
+    },
+    "Eric": {
+        "Holy Warrior": {"effect": "Enemy Troop Attack Down", "values": [4, 8, 12, 16, 20]},
+        "Conviction": {"effect": "Damage Taken Down", "values": [4, 8, 12, 16, 20]},
+        "Exhortation": {"effect": "Health Up", "values": [5, 10, 15, 20, 25]}
+    },
+    "Jabel": {
+        "No Skill": {"effect": "No bonus", "values": [0]},
+        "Rally Flag": {"effect": "Damage Taken Chance Down", "values": [8, 16, 24, 32, 40]},
+        "Hero's Domain": {"effect": "Damage Up", "values": [10, 20, 30, 40, 50]},
+        "Youthful Rage": {"effect": "Lethality Up", "values": [5, 10, 15, 20, 25]}
+    }
+}
+
+# First expedition skill per hero: the only one that counts for joiners
+FIRST_SKILL = {hero: next(iter(HERO_SKILLS[hero])) for hero in HEROES}
+
+HERO_INDEX = {hero: i for i, hero in enumerate(HEROES)}
+MAX_LEVEL = max(len(data['values']) for skills in HERO_SKILLS.values() for data in skills.values())
+
+# Small-integer codes for compact rally state (custom_ids, session records)
+# Captain entries: one code per (hero, skill, level), 136 in total
+CAPTAIN_OPTIONS = [
+    (hero, skill, level)
+    for hero in HEROES
+    for skill, data in HERO_SKILLS[hero].items()
+    for level in range(1, len(data['values']) + 1)
+]
+CAPTAIN_OPTION_CODES = {option: code for code, option in enumerate(CAPTAIN_OPTIONS)}
+
+
+def joiner_code(hero, level):
+    """Joiners always use their first skill, so hero and level are enough"""
+    return HERO_INDEX[hero] * MAX_LEVEL + level - 1
+
+
+def joiner_from_code(code):
+    hero_index, level_index = divmod(code, MAX_LEVEL)
+    return HEROES[hero_index], level_index + 1
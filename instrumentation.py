@@ -0,0 +1,135 @@
+"""Latency breakdown for rally wizard callbacks.
+
+@instrumented wraps a callback that takes an `interaction` argument and
+opens a span for the click. Inside the span:
+- functions decorated with @embed_section add their run time to the embed
+  budget
+- InteractionResponse calls (patched once by install()) add theirs to the
+  Discord API budget, and the first one marks when we answered
+
+When the outermost callback returns, the span is written to the histograms
+in metrics.py. Nested instrumented calls (a callback handing over to
+complete_captain_slot) join the outer span, so each click is counted once.
+
+Everything can be switched off at runtime with set_enabled(False); a
+disabled wrapper costs one global lookup per call.
+"""
+import contextvars
+import functools
+import inspect
+import os
+import time
+
+import discord
+
+from metrics import (
+    WIZARD_API_SECONDS, WIZARD_EMBED_SECONDS, WIZARD_INFLIGHT, WIZARD_RESPONSE_SECONDS, WIZARD_STEP_SECONDS
+)
+
+ENABLED = os.getenv("RALLY_INSTRUMENTATION", "1") != "0"
+
+DISCORD_EPOCH_MS = 1420070400000
+
+_span = contextvars.ContextVar("rally_span", default=None)
+
+
+class Span:
+    __slots__ = ('start', 'embed', 'api', 'responded_at')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.embed = 0.0
+        self.api = 0.0
+        self.responded_at = None  # wall clock, comparable with snowflake timestamps
+
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+
+def interaction_created_at(interaction):
+    """Creation time (epoch seconds) encoded in the interaction's snowflake id"""
+    return ((interaction.id >> 22) + DISCORD_EPOCH_MS) / 1000
+
+
+def instrumented(func):
+    """Record step, embed and API time for an async callback taking `interaction`"""
+    parameters = list(inspect.signature(func).parameters)
+    position = parameters.index('interaction')
+    step = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not ENABLED or _span.get() is not None:
+            return await func(*args, **kwargs)
+
+        span = Span()
+        token = _span.set(span)
+        WIZARD_INFLIGHT.inc()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _span.reset(token)
+            WIZARD_INFLIGHT.dec()
+            WIZARD_STEP_SECONDS.observe(time.perf_counter() - span.start, step=step)
+            WIZARD_EMBED_SECONDS.observe(span.embed, step=step)
+            WIZARD_API_SECONDS.observe(span.api, step=step)
+            interaction = kwargs.get('interaction', args[position] if position < len(args) else None)
+            if span.responded_at is not None and interaction is not None:
+                WIZARD_RESPONSE_SECONDS.observe(
+                    max(0.0, span.responded_at - interaction_created_at(interaction)), step=step
+                )
+
+    return wrapper
+
+
+def embed_section(func):
+    """Count a (synchronous) embed builder's run time against the current span"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        span = _span.get() if ENABLED else None
+        if span is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            span.embed += time.perf_counter() - start
+
+    return wrapper
+
+
+def _api_call(method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        span = _span.get() if ENABLED else None
+        if span is None:
+            return await method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            span.api += time.perf_counter() - start
+            if span.responded_at is None:
+                span.responded_at = time.time()
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+# Interaction round trips timed by install()
+API_METHODS = (
+    (discord.InteractionResponse, ('defer', 'send_message', 'edit_message', 'send_modal')),
+    (discord.Interaction, ('edit_original_response', 'delete_original_response')),
+)
+
+
+def install():
+    """Patch the py-cord interaction methods once so API time is measured"""
+    for cls, names in API_METHODS:
+        for name in names:
+            method = getattr(cls, name)
+            if not getattr(method, 'instrumented', False):
+                setattr(cls, name, _api_call(method))
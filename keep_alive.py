@@ -1,16 +1,23 @@
-from flask import Flask
-import threading
-import time
-import os
+import asyncio
 from datetime import datetime
-import urllib.request
-import urllib.error
 
-app = Flask('')
+import aiohttp
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return f"""
+import metrics
+
+PORT = 8080
+SELF_PING_URL = f"http://localhost:{PORT}/ping"
+
+# Served on the bot's own event loop (aiohttp ships with py-cord), no extra threads
+routes = web.RouteTableDef()
+
+# Strong references, otherwise the loop may garbage collect running tasks
+_tasks = set()
+
+@routes.get('/')
+async def home(request):
+    return web.Response(content_type='text/html', text=f"""
     <h1>🐻 Bear Hunt Rally Calculator Bot</h1>
     <p>✅ Bot is alive and running!</p>
     <p>🕐 Last check: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
@@ -23,41 +30,52 @@ def home():
     </ul>
     <p>🚀 Use <code>/rally_calculator</code> in Discord to start!</p>
     <p>🏓 Self-ping active every 20 minutes</p>
-    """
+    """)
 
-@app.route('/health')
-def health():
-    return "OK"
+@routes.get('/health')
+async def health(request):
+    return web.Response(text="OK")
 
-@app.route('/ping')
-def ping():
-    return f"Pong! {datetime.now().strftime('%H:%M:%S')}"
+@routes.get('/ping')
+async def ping(request):
+    return web.Response(text=f"Pong! {datetime.now().strftime('%H:%M:%S')}")
 
-def self_ping():
+@routes.get('/metrics')
+async def metrics_endpoint(request):
+    # Prometheus text exposition format
+    return web.Response(text=metrics.render(), content_type='text/plain')
+
+async def run(app=None):
+    """Serve `app` (default: the routes above) on PORT"""
+    if app is None:
+        app = web.Application()
+        app.add_routes(routes)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', PORT).start()
+    print(f"🌐 Keep-alive web server started on port {PORT}")
+
+async def self_ping():
     """Ping the server every 20 minutes to keep it awake"""
-    time.sleep(60)  # Wait 1 minute before starting
-    while True:
-        try:
-            time.sleep(1200)  # 20 minutes
-            # Use urllib instead of requests (built-in Python library)
-            with urllib.request.urlopen('http://localhost:8080/ping', timeout=10) as response:
-                result = response.read().decode()
-                print(f"🏓 Self-ping successful: {result}")
-        except Exception as e:
-            print(f"❌ Self-ping failed: {e}")
-
-def run():
-    app.run(host='0.0.0.0', port=8080, debug=False, use_reloader=False)
-
-def keep_alive():
-    # Start Flask server
-    server_thread = threading.Thread(target=run)
-    server_thread.daemon = True
-    server_thread.start()
-    print("🌐 Keep-alive web server started on port 8080")
-    
-    # Start self-ping mechanism
-    ping_thread = threading.Thread(target=self_ping)
-    ping_thread.daemon = True
-    ping_thread.start()
-    print("🏓 Self-ping mechanism started (every 20 minutes)")
\ No newline at end of file
+    await asyncio.sleep(60)  # Wait 1 minute before starting
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while True:
+            await asyncio.sleep(1200)  # 20 minutes
+            try:
+                async with session.get(SELF_PING_URL) as response:
+                    result = await response.text()
+                    print(f"🏓 Self-ping successful: {result}")
+            except Exception as e:
+                print(f"❌ Self-ping failed: {e}")
+
+def _schedule(loop, coro):
+    task = loop.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+def keep_alive(loop):
+    """Schedule the web server and self-ping on `loop` (pass bot.loop before bot.run)"""
+    _schedule(loop, run())
+    _schedule(loop, self_ping())
+    print("🏓 Self-ping mechanism started (every 20 minutes)")
@@ -3,12 +3,7 @@ import discord
 from discord.ext import commands
 from discord import ui, Interaction
 
-# Optional: Import keep-alive for 24/7 hosting
-try:
-    from keep_alive import keep_alive
-    keep_alive()
-except ImportError:
-    print("ℹ️ Keep-alive not available (optional)")
+from status_probes import Probe, StatusProbes
 
 # Get bot token from environment variable for secure deployment
 BOT_TOKEN = os.getenv("DISCORD_TOKEN")
@@ -22,6 +17,20 @@ intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='!', intents=intents)
 
+# Optional: keep-alive web server for 24/7 hosting, runs on the bot's event loop
+try:
+    from keep_alive import keep_alive
+    keep_alive(bot.loop)
+except ImportError:
+    print("ℹ️ Keep-alive not available (optional)")
+
+# /status reads these from a cache refreshed in the background, never inline
+STATUS_PROBES = StatusProbes([
+    Probe('web', 'http://localhost:8080/ping', timeout=5),
+    Probe('koyeb', 'https://collective-wildebeest-discordpxt272-f4306de1.koyeb.app/health', timeout=10, expect="OK"),
+])
+STATUS_PROBES.start(bot.loop)
+
 @bot.event
 async def on_ready():
     print(f"🤖 {bot.user} has logged in!")
@@ -724,13 +733,12 @@ async def rally_calculator(ctx):
 async def status(ctx):
     """Check the status of all bot services and infrastructure"""
     try:
-        import urllib.request
-        import urllib.error
         from datetime import datetime
         import time
         
         # Start timing
         start_time = time.time()
+        probes = STATUS_PROBES.snapshot()
         
         embed = discord.Embed(
             title="🔍 System Status Check",
@@ -745,15 +753,11 @@ async def status(ctx):
         )
         
         # Keep-alive Web Server Status
-        web_status = "❌ Offline"
+        web_status = "⏳ Checking..."
         web_response_time = "N/A"
-        try:
-            web_start = time.time()
-            with urllib.request.urlopen('http://localhost:8080/ping', timeout=5) as response:
-                web_response_time = f"{round((time.time() - web_start) * 1000)}ms"
-                web_status = "✅ Online"
-        except Exception as e:
-            web_status = f"❌ Error: {str(e)[:30]}..."
+        if probes['web'] is not None:
+            web_status = probes['web'].status
+            web_response_time = f"{probes['web'].response_time} ({round(probes['web'].age())}s ago)"
         
         embed.add_field(
             name="🌐 Keep-Alive Server",
@@ -762,19 +766,11 @@ async def status(ctx):
         )
         
         # External Monitoring Status
-        koyeb_status = "❌ Offline"
+        koyeb_status = "⏳ Checking..."
         koyeb_response_time = "N/A"
-        try:
-            koyeb_start = time.time()
-            koyeb_url = "https://collective-wildebeest-discordpxt272-f4306de1.koyeb.app/health"
-            with urllib.request.urlopen(koyeb_url, timeout=10) as response:
-                koyeb_response_time = f"{round((time.time() - koyeb_start) * 1000)}ms"
-                if response.read().decode() == "OK":
-                    koyeb_status = "✅ Online"
-                else:
-                    koyeb_status = "⚠️ Responding but not OK"
-        except Exception as e:
-            koyeb_status = f"❌ Error: {str(e)[:30]}..."
+        if probes['koyeb'] is not None:
+            koyeb_status = probes['koyeb'].status
+            koyeb_response_time = f"{probes['koyeb'].response_time} ({round(probes['koyeb'].age())}s ago)"
         
         embed.add_field(
             name="☁️ Koyeb Public Endpoint",
@@ -802,7 +798,7 @@ async def status(ctx):
         # System Info
         embed.add_field(
             name="⚙️ System Info",
-            value=f"🐍 Python Runtime\n🌐 Flask Keep-Alive\n🔄 Self-Ping Active",
+            value=f"🐍 Python Runtime\n🌐 Async Keep-Alive\n🔄 Self-Ping Active",
             inline=True
         )
         
@@ -3,13 +3,6 @@ import discord
 from discord.ext import commands
 from discord import ui, Interaction
 
-# Optional: Import keep-alive for 24/7 hosting
-try:
-    from keep_alive import keep_alive
-    keep_alive()
-except ImportError:
-    print("ℹ️ Keep-alive not available (optional)")
-
 # Get bot token from environment variable for secure deployment
 BOT_TOKEN = os.getenv("DISCORD_TOKEN")
 
@@ -22,6 +15,13 @@ intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='!', intents=intents)
 
+# Optional: keep-alive web server for 24/7 hosting, runs on the bot's event loop
+try:
+    from keep_alive import keep_alive
+    keep_alive(bot.loop)
+except ImportError:
+    print("ℹ️ Keep-alive not available (optional)")
+
 @bot.event
 async def on_ready():
     print(f"🤖 {bot.user} has logged in!")
@@ -0,0 +1,268 @@
+"""Prometheus metrics, rendered in the text exposition format.
+
+Only the standard library is used: counters, gauges and histograms are kept
+in plain dicts keyed by label values, and render() writes them out for the
+keep-alive server's /metrics route. In cluster mode each worker sends
+collect() to the coordinator, which merge()s them under a `worker` label.
+Updates are a dict lookup and a few additions, cheap enough for every
+command and wizard click.
+"""
+import abc
+import asyncio
+import bisect
+import math
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SECTION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CHARS_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 6000)  # Discord caps an embed at 6000 characters
+LAG_INTERVAL = 0.5  # seconds between event-loop lag samples
+
+REGISTRY = []
+
+# Strong reference to the lag sampler so the loop can't garbage collect it
+_lag_task = None
+
+
+def _format_labels(pairs):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value)"""
+
+    def family(self):
+        """(name, kind, documentation, [(suffix, label pairs, value), ...]), picklable"""
+        samples = [
+            (suffix, tuple(zip(self.labelnames, values)) + extra, value)
+            for suffix, values, extra, value in self.samples()
+        ]
+        return self.name, self.kind, self.documentation, samples
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        # Unlabelled metrics are exported as 0 before their first update
+        self.values = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield "_total", key, (), value
+
+
+class Gauge(Metric):
+    """Set directly, or read from `function()` at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.values = {} if self.labelnames else {(): 0}
+        self.function = function
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                value = math.nan
+            yield "", (), (), value
+            return
+        for key, value in self.values.items():
+            yield "", key, (), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield "_bucket", key, (("le", _format_value(bound)),), cumulative
+            cumulative += series[len(self.buckets)]
+            yield "_bucket", key, (("le", "+Inf"),), cumulative
+            yield "_sum", key, (), series[-1]
+            yield "_count", key, (), cumulative
+
+
+class _Timer:
+    """`with HISTOGRAM.time(label=...):` observes the block's wall time"""
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+def collect():
+    """Every registered metric as a picklable family, e.g. to send to another process"""
+    return [metric.family() for metric in REGISTRY]
+
+
+def merge(collections, label="worker"):
+    """Combine {source: families} into one family list, tagging samples with `label`"""
+    merged = {}
+    for source, families in collections.items():
+        for name, kind, documentation, samples in families:
+            family = merged.setdefault(name, (name, kind, documentation, []))
+            family[3].extend((suffix, ((label, source),) + labels, value) for suffix, labels, value in samples)
+    return list(merged.values())
+
+
+def render(families=None):
+    """Families (default: every registered metric) in Prometheus text format"""
+    lines = []
+    for name, kind, documentation, samples in collect() if families is None else families:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Bot metrics
+COMMAND_SECONDS = Histogram(
+    "bot_command_duration_seconds", "Time to handle a prefix command", ["command", "outcome"]
+)
+WIZARD_STEP_SECONDS = Histogram(
+    "rally_wizard_step_duration_seconds", "Time to handle one rally wizard click", ["step"]
+)
+WIZARD_EMBED_SECONDS = Histogram(
+    "rally_wizard_embed_seconds", "Time spent building embeds during one wizard click", ["step"],
+    buckets=SECTION_BUCKETS
+)
+WIZARD_API_SECONDS = Histogram(
+    "rally_wizard_discord_api_seconds", "Time spent waiting on Discord's API during one wizard click", ["step"]
+)
+WIZARD_RESPONSE_SECONDS = Histogram(
+    "rally_wizard_response_seconds", "Time from interaction creation until our response was accepted", ["step"]
+)
+EMBED_PAYLOAD_CHARS = Histogram(
+    "rally_embed_payload_chars", "Title plus description characters of each rendered wizard or summary embed",
+    ["template"], buckets=CHARS_BUCKETS
+)
+WIZARD_INFLIGHT = Gauge("rally_wizard_inflight", "Wizard clicks being handled right now")
+GATEWAY_LATENCY = Gauge("discord_gateway_latency_seconds", "Heartbeat latency reported by bot.latency")
+PERSISTENT_VIEWS = Gauge("discord_persistent_views", "Views registered with bot.add_view")
+RALLY_SESSIONS = Gauge("rally_sessions", "Rally sessions held in the session store")
+RALLY_SESSION_BYTES = Gauge("rally_session_bytes", "Estimated memory held by the session store")
+RESULT_CACHE_HITS = Gauge("rally_result_cache_hits", "Final rally calculations served from the result cache")
+RESULT_CACHE_MISSES = Gauge("rally_result_cache_misses", "Final rally calculations computed and cached")
+RESULT_CACHE_ENTRIES = Gauge("rally_result_cache_entries", "Compositions held in the result cache")
+MESSAGE_EDITS = Counter(
+    "discord_message_edits", "Outbound message edits by outcome (sent, merged, unchanged, rate_limited, failed)",
+    ["outcome"]
+)
+MESSAGE_EDIT_WAIT_SECONDS = Histogram(
+    "discord_message_edit_wait_seconds", "Time from queueing a message edit until its rate-limit buckets allowed it"
+)
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the event loop woke a sleeping task", buckets=LAG_BUCKETS
+)
+
+
+async def monitor_loop_lag(interval=LAG_INTERVAL):
+    """Sample how late a fixed sleep wakes up; anything over `interval` is lag"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - interval))
+
+
+def instrument_bot(bot, sessions=None):
+    """Hook command timing and bot gauges into a commands.Bot"""
+    global _lag_task
+
+    # Invoke hooks rather than on_command_error listeners, which would silence
+    # the default error printout; after_invoke runs even if the command raised
+    @bot.before_invoke
+    async def _command_started(ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    @bot.after_invoke
+    async def _command_finished(ctx):
+        outcome = "error" if ctx.command_failed else "ok"
+        COMMAND_SECONDS.observe(time.perf_counter() - ctx.metrics_started, command=ctx.command.qualified_name, outcome=outcome)
+
+    # bot.latency is nan before the first heartbeat
+    GATEWAY_LATENCY.set_function(lambda: bot.latency)
+    PERSISTENT_VIEWS.set_function(lambda: len(bot.persistent_views))
+    if sessions is not None:
+        RALLY_SESSIONS.set_function(lambda: len(sessions))
+        RALLY_SESSION_BYTES.set_function(sessions.nbytes)
+    if _lag_task is None:
+        _lag_task = bot.loop.create_task(monitor_loop_lag())
+
@@ -0,0 +1,180 @@
+"""Split an alliance roster into N simultaneous Bear Hunt rallies.
+
+Each rally gets a captain (up to 3 of their own heroes, additive) and 4
+counted joiners (their best first skill), the same rule as a single
+rally's calculation. The roster lists first-skill levels, so captains are
+scored on their heroes' first skills too.
+
+Under that rule the alliance total doesn't depend on which rally a member
+joins, only on who captains and who joins:
+1. Pruning: only the 5N best captains and the 5N best joiners can be in
+   an optimal pick (any other chosen member could be swapped for an
+   unused one at least as good), so at most 10N members are searched.
+2. Selection: a DP over those members with state (captains, joiners
+   picked so far) finds the roles that maximise the total exactly.
+3. Balancing: joiners are dealt to rallies best first, each to the
+   weakest rally with room, then pairs are swapped between rallies while
+   that narrows the spread, until no swap helps or time runs out.
+
+Runs in the worker pool (workers.py). Only hero_data is imported so
+forked workers start light; if the time budget ends during the DP the
+greedy pick (best captains first, then the best remaining joiners) is
+used, and balancing always returns the best layout found so far.
+"""
+import time
+
+from hero_data import FIRST_SKILL, HERO_SKILLS
+
+MAX_RALLIES = 10  # 10 rallies x 5 members fits in one embed
+CAPTAIN_HEROES = 3
+JOINERS_PER_RALLY = 4
+DEFAULT_TIME_BUDGET = 5.0
+
+
+def first_skill_value(hero, level):
+    return HERO_SKILLS[hero][FIRST_SKILL[hero]]['values'][level - 1]
+
+
+def member_roles(heroes):
+    """(captain value, captain heroes, joiner value, joiner hero) for one member's (hero, level) pairs"""
+    ranked = sorted(((first_skill_value(hero, level), hero, level) for hero, level in heroes), reverse=True)
+    captain = ranked[:CAPTAIN_HEROES]
+    return sum(value for value, _, _ in captain), captain, ranked[0][0], ranked[0]
+
+
+def _greedy(members, rallies, joiner_slots):
+    captains = sorted(range(len(members)), key=lambda i: members[i][0], reverse=True)[:rallies]
+    taken = set(captains)
+    rest = sorted((i for i in range(len(members)) if i not in taken), key=lambda i: members[i][2], reverse=True)
+    return captains, rest[:joiner_slots]
+
+
+def _select(members, candidates, rallies, joiner_slots, deadline):
+    """Exact role selection over `candidates`; None if the deadline passes first"""
+    # best[c][j]: best total with c captains and j joiners picked so far
+    unreachable = -1
+    best = [[unreachable] * (joiner_slots + 1) for _ in range(rallies + 1)]
+    best[0][0] = 0
+    choices = []  # per candidate: {(c, j): role} for states it improved
+    for i in candidates:
+        if time.perf_counter() > deadline:
+            return None
+        captain_value, _, joiner_value, _ = members[i]
+        improved = {}
+        # Walk states downwards so each member takes at most one role (0/1 knapsack)
+        for c in range(rallies, -1, -1):
+            row = best[c]
+            below = best[c - 1] if c else None
+            for j in range(joiner_slots, -1, -1):
+                if c and below[j] != unreachable and below[j] + captain_value > row[j]:
+                    row[j] = below[j] + captain_value
+                    improved[c, j] = 'captain'
+                if j and row[j - 1] != unreachable and row[j - 1] + joiner_value > row[j]:
+                    row[j] = row[j - 1] + joiner_value
+                    improved[c, j] = 'joiner'
+        choices.append(improved)
+
+    # Fewer joiners than slots only if the roster is that small
+    j = max(range(joiner_slots + 1), key=lambda j: (best[rallies][j], j))
+    c = rallies
+    captains, joiners = [], []
+    for i, improved in zip(reversed(candidates), reversed(choices)):
+        role = improved.get((c, j))
+        if role == 'captain':
+            captains.append(i)
+            c -= 1
+        elif role == 'joiner':
+            joiners.append(i)
+            j -= 1
+    return captains, joiners
+
+
+def _balance(totals, groups, members, deadline):
+    """Swap joiners between rallies while it narrows the spread; returns True if it converged"""
+    improved = True
+    while improved:
+        improved = False
+        if time.perf_counter() > deadline:
+            return False
+        order = sorted(range(len(totals)), key=totals.__getitem__)
+        # Weakest rally against the strongest first, where a swap helps most
+        for low in order:
+            for high in reversed(order):
+                gap = totals[high] - totals[low]
+                if gap <= 0:
+                    break
+                # Moving d from high to low narrows the pair's spread when 0 < d < gap
+                move = None
+                for a in groups[high]:
+                    for b in groups[low]:
+                        d = members[a][2] - members[b][2]
+                        if 0 < d < gap and (move is None or abs(gap - 2 * d) < abs(gap - 2 * move[2])):
+                            move = (a, b, d)
+                if move is None:
+                    continue
+                a, b, d = move
+                groups[high][groups[high].index(a)] = b
+                groups[low][groups[low].index(b)] = a
+                totals[high] -= d
+                totals[low] += d
+                improved = True
+                break
+            if improved:
+                break
+    return True
+
+
+def assign_rallies(roster, rallies, time_budget=DEFAULT_TIME_BUDGET):
+    """Best split of `roster` [(name, ((hero, level), ...))] into `rallies` rallies.
+
+    Returns a dict with 'rallies' (each with the captain's name, heroes,
+    joiners and total, strongest first), 'total', 'unassigned' (members
+    left out), 'optimal' (role selection finished) and 'balanced'
+    (swapping converged) within the time budget.
+    """
+    deadline = time.perf_counter() + time_budget
+    if not 1 <= rallies <= MAX_RALLIES:
+        raise ValueError(f"Choose between 1 and {MAX_RALLIES} rallies")
+    roster = [(name, heroes) for name, heroes in roster if heroes]
+    if len(roster) < rallies:
+        raise ValueError(f"{rallies} rallies need at least {rallies} members to captain them, the roster has {len(roster)}")
+
+    members = [member_roles(heroes) for _, heroes in roster]
+    joiner_slots = min(JOINERS_PER_RALLY * rallies, len(members) - rallies)
+    keep = rallies + joiner_slots
+    by_captain = sorted(range(len(members)), key=lambda i: members[i][0], reverse=True)[:keep]
+    by_joiner = sorted(range(len(members)), key=lambda i: members[i][2], reverse=True)[:keep]
+    candidates = sorted(set(by_captain) | set(by_joiner))
+
+    picked = _select(members, candidates, rallies, joiner_slots, deadline)
+    optimal = picked is not None
+    captains, joiners = picked if optimal else _greedy(members, rallies, joiner_slots)
+
+    # Strongest captain first, then deal joiners best first to the weakest rally with room
+    captains.sort(key=lambda i: members[i][0], reverse=True)
+    totals = [members[i][0] for i in captains]
+    groups = [[] for _ in captains]
+    for i in sorted(joiners, key=lambda i: members[i][2], reverse=True):
+        r = min((r for r in range(rallies) if len(groups[r]) < JOINERS_PER_RALLY), key=lambda r: totals[r])
+        groups[r].append(i)
+        totals[r] += members[i][2]
+    balanced = _balance(totals, groups, members, deadline)
+
+    result = []
+    for captain, group, total in zip(captains, groups, totals):
+        group.sort(key=lambda i: members[i][2], reverse=True)
+        result.append({
+            'captain': roster[captain][0],
+            'captain_heroes': [(hero, level, value) for value, hero, level in members[captain][1]],
+            'captain_total': members[captain][0],
+            'joiners': [(roster[i][0], members[i][3][1], members[i][3][2], members[i][2]) for i in group],
+            'total': total,
+        })
+    result.sort(key=lambda rally: rally['total'], reverse=True)
+    return {
+        'rallies': result,
+        'total': sum(totals),
+        'unassigned': len(members) - rallies - len(joiners),
+        'optimal': optimal,
+        'balanced': balanced,
+    }
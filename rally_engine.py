@@ -0,0 +1,161 @@
+"""Discord-free rally calculation engine.
+
+Rallies are scored over NumPy arrays so thousands of candidate compositions
+can be evaluated in one call. A composition is a captain (1-3 heroes, each
+with one skill at one level) plus any number of joiners.
+
+Two scoring rules are supported:
+- additive: captain skills + top 4 joiner skills (main.py rules)
+- multiplicative: captain and every joiner summed per HERO_EFFECT_OPS
+  group, groups multiplied (the main_backup.py variant, which has no top 4)
+"""
+import heapq
+
+import numpy as np
+
+from hero_data import HERO_INDEX, HEROES, HERO_EFFECT_OPS, HERO_SKILLS
+from top_joiners import TOP_JOINERS
+
+MAX_CAPTAIN_HEROES = 3
+
+# Dense group index per hero, so per-op totals fit in a (rallies, groups) array
+EFFECT_OP_CODES = sorted(set(HERO_EFFECT_OPS[hero] for hero in HEROES))
+HERO_OP_INDEX = np.array(
+    [EFFECT_OP_CODES.index(HERO_EFFECT_OPS[hero]) for hero in HEROES],
+    dtype=np.intp
+)
+
+
+def skill_value(hero, skill, level):
+    """Percentage for a hero skill at a 1-based level"""
+    values = HERO_SKILLS[hero][skill]['values']
+    if not 1 <= level <= len(values):
+        raise ValueError(f"{hero} - {skill} has no level {level} (1-{len(values)})")
+    return values[level - 1]
+
+
+def make_entry(hero, skill, level):
+    """{'hero', 'skill', 'level', 'effect'} dict for one hero skill; raises ValueError for a level it doesn't have"""
+    return {'hero': hero, 'skill': skill, 'level': level, 'effect': skill_value(hero, skill, level)}
+
+
+def encode_entries(entry_lists, width=None):
+    """Pack lists of {'hero', 'effect'} dicts into (hero index, value) arrays.
+
+    Missing slots are padded with hero index -1 and value 0, which scores as
+    an empty slot under both rules.
+    """
+    if width is None:
+        width = max((len(entries) for entries in entry_lists), default=0)
+    heroes = np.full((len(entry_lists), width), -1, dtype=np.intp)
+    values = np.zeros((len(entry_lists), width), dtype=np.int32)
+    for row, entries in enumerate(entry_lists):
+        for col, entry in enumerate(entries):
+            heroes[row, col] = HERO_INDEX[entry['hero']]
+            values[row, col] = entry['effect']
+    return heroes, values
+
+
+def top_joiner_mask(joiner_values, k=TOP_JOINERS):
+    """Boolean mask of the k highest joiner values in each row.
+
+    Ties keep the earliest joiner, matching a stable sort by value.
+    """
+    joiner_values = np.asarray(joiner_values)
+    mask = np.zeros(joiner_values.shape, dtype=bool)
+    if joiner_values.shape[-1] <= k:
+        mask[...] = True
+        return mask
+    # Stable descending order: sort on the negated values
+    order = np.argsort(-joiner_values, axis=-1, kind='stable')[..., :k]
+    np.put_along_axis(mask, order, True, axis=-1)
+    return mask
+
+
+def top_joiner_totals(joiner_values, k=TOP_JOINERS):
+    """Sum of the k highest joiner values in each row"""
+    joiner_values = np.asarray(joiner_values)
+    if joiner_values.shape[-1] <= k:
+        return joiner_values.sum(axis=-1)
+    top = np.partition(joiner_values, -k, axis=-1)[..., -k:]
+    return top.sum(axis=-1)
+
+
+def score_additive(captain_values, joiner_values, k=TOP_JOINERS):
+    """Captain skills (additive) + top k joiner skills, one total per row"""
+    captain_values = np.asarray(captain_values)
+    return captain_values.sum(axis=-1) + top_joiner_totals(joiner_values, k)
+
+
+def group_totals(hero_indices, values):
+    """Sum values per HERO_EFFECT_OPS group -> (rows, groups) array"""
+    hero_indices = np.asarray(hero_indices)
+    values = np.asarray(values)
+    totals = np.zeros((hero_indices.shape[0], len(EFFECT_OP_CODES)), dtype=np.float64)
+    filled = hero_indices >= 0
+    rows = np.nonzero(filled)[0]
+    np.add.at(totals, (rows, HERO_OP_INDEX[hero_indices[filled]]), values[filled])
+    return totals
+
+
+def score_multiplicative(captain_heroes, captain_values, joiner_heroes, joiner_values):
+    """Per-group sums multiplied together, returned as a percentage bonus.
+
+    Every joiner contributes, as in main_backup.py; unlike the additive
+    rule there is no top 4 cut.
+    """
+    heroes = np.concatenate([np.asarray(captain_heroes), np.asarray(joiner_heroes)], axis=1)
+    values = np.concatenate([np.asarray(captain_values), np.asarray(joiner_values)], axis=1)
+    multiplier = np.prod(1 + group_totals(heroes, values) / 100, axis=1)
+    return (multiplier - 1) * 100
+
+
+def score_rallies(captains, joiners, rule='additive'):
+    """Score many rallies given as lists of entry dicts.
+
+    `captains` and `joiners` are parallel lists; each element is the list of
+    {'hero', 'skill', 'effect'} dicts for one rally.
+    """
+    captain_heroes, captain_values = encode_entries(captains, MAX_CAPTAIN_HEROES)
+    joiner_heroes, joiner_values = encode_entries(joiners)
+    if rule == 'additive':
+        return score_additive(captain_values, joiner_values)
+    if rule == 'multiplicative':
+        return score_multiplicative(captain_heroes, captain_values, joiner_heroes, joiner_values)
+    raise ValueError(f"Unknown scoring rule: {rule}")
+
+
+def split_joiners(joiners):
+    """(counted top 4 joiners best first, excluded joiners in entry order)"""
+    # O(n log 4) instead of sorting the roster; like a stable sort, equal
+    # values keep the order members were entered in
+    counted = heapq.nlargest(TOP_JOINERS, joiners, key=lambda x: x['effect'])
+    counted_ids = {id(joiner) for joiner in counted}
+    return counted, [joiner for joiner in joiners if id(joiner) not in counted_ids]
+
+
+def calculate_rally(captain_heroes, joiners):
+    """Score a single rally with the additive rule.
+
+    Returns a dict with the captain, joiner and overall totals, the counted
+    (top 4) joiners best first and the excluded joiners in entry order.
+    """
+    captain_total = sum(hero['effect'] for hero in captain_heroes)
+    counted, excluded = split_joiners(joiners)
+    joiner_total = sum(joiner['effect'] for joiner in counted)
+    return {
+        'captain_total': captain_total,
+        'joiner_total': joiner_total,
+        'total': captain_total + joiner_total,
+        'counted': counted,
+        'excluded': excluded,
+    }
+
+
+def rally_status(total_rally_bonus):
+    """Embed color and rating label for a total rally bonus"""
+    if total_rally_bonus < 50:
+        return 0xff0000, "Below Optimal"
+    elif total_rally_bonus <= 100:
+        return 0xffa500, "Good Setup"
+    return 0x00ff00, "Excellent!"
@@ -0,0 +1,247 @@
+"""Branch-and-bound search for the best rally composition.
+
+Searches captain trios (distinct heroes, any skill) and top-4 joiners
+(first skill only, duplicates allowed) under ownership and level caps.
+
+Two dominance rules shrink the space before the search starts: a higher
+level never scores less, so only the highest allowed level of each skill
+is kept, and since both scoring rules group by hero rather than skill,
+only each hero's best skill is kept. The remaining space is explored
+depth-first with an optimistic bound: every open slot is assumed to take
+the best value still available, which for the multiplicative rule means
+a factor of at most (1 + value/100).
+"""
+import re
+import time
+
+from hero_data import HEROES, HERO_EFFECT_OPS, HERO_SKILLS, MAX_LEVEL
+from rally_engine import MAX_CAPTAIN_HEROES, TOP_JOINERS, calculate_rally, encode_entries, score_multiplicative
+
+DEFAULT_TIME_BUDGET = 1.0  # seconds, well inside Discord's 3 second deadline
+
+OPTIMIZE_KEYS = ("heroes", "joiners", "max", "effect", "rule")
+
+
+def _best_option(hero, skills, max_level, skill_caps, effects):
+    """Highest-value (skill, level, value) a hero can bring, or None"""
+    best = None
+    for skill in skills:
+        data = HERO_SKILLS[hero][skill]
+        if effects and data['effect'] not in effects:
+            continue
+        level = min(max_level, skill_caps.get((hero, skill), max_level), len(data['values']))
+        if level < 1:
+            continue
+        value = data['values'][level - 1]
+        if best is None or value > best[2]:
+            best = (skill, level, value)
+    return best
+
+
+def _candidates(heroes, first_skill_only, max_level, skill_caps, effects):
+    candidates = []
+    for hero in heroes:
+        skills = list(HERO_SKILLS[hero].keys())
+        if first_skill_only:
+            skills = skills[:1]
+        option = _best_option(hero, skills, max_level, skill_caps, effects)
+        if option is not None:
+            skill, level, value = option
+            candidates.append({'hero': hero, 'skill': skill, 'level': level, 'effect': value})
+    # Best first, so the bound for "any candidate after index i" is a slice
+    candidates.sort(key=lambda c: c['effect'], reverse=True)
+    return candidates
+
+
+class _Search:
+    def __init__(self, captains, joiners, captain_slots, joiner_slots, rule, deadline):
+        self.captains = captains
+        self.joiners = joiners
+        self.captain_slots = captain_slots
+        self.joiner_slots = joiner_slots
+        self.multiplicative = rule == 'multiplicative'
+        self.deadline = deadline
+        self.groups = {}
+        self.picked_captains = []
+        self.picked_joiners = []
+        self.best_score = -1.0
+        self.best = None
+        self.nodes = 0
+        self.timed_out = False
+
+    def score(self):
+        if self.multiplicative:
+            multiplier = 1.0
+            for total in self.groups.values():
+                multiplier *= 1 + total / 100
+            return (multiplier - 1) * 100
+        return float(sum(self.groups.values()))
+
+    def bound(self, remaining_values):
+        if self.multiplicative:
+            multiplier = (self.score() / 100) + 1
+            for value in remaining_values:
+                multiplier *= 1 + value / 100
+            return (multiplier - 1) * 100
+        return self.score() + sum(remaining_values)
+
+    def _push(self, candidate):
+        op = HERO_EFFECT_OPS[candidate['hero']]
+        self.groups[op] = self.groups.get(op, 0) + candidate['effect']
+
+    def _pop(self, candidate):
+        op = HERO_EFFECT_OPS[candidate['hero']]
+        self.groups[op] -= candidate['effect']
+        if not self.groups[op]:
+            del self.groups[op]
+
+    def _optimistic(self, next_captain, next_joiner):
+        open_captains = self.captain_slots - len(self.picked_captains)
+        open_joiners = self.joiner_slots - len(self.picked_joiners)
+        values = [c['effect'] for c in self.captains[next_captain:next_captain + open_captains]]
+        if open_joiners and next_joiner < len(self.joiners):
+            values += [self.joiners[next_joiner]['effect']] * open_joiners
+        return values
+
+    def run(self, next_captain=0, next_joiner=0):
+        self.nodes += 1
+        if self.nodes % 256 == 0 and time.perf_counter() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return
+
+        captains_done = len(self.picked_captains) == self.captain_slots
+        joiners_done = len(self.picked_joiners) == self.joiner_slots
+        if captains_done and joiners_done:
+            score = self.score()
+            if score > self.best_score:
+                self.best_score = score
+                self.best = (list(self.picked_captains), list(self.picked_joiners))
+            return
+
+        if self.bound(self._optimistic(next_captain, next_joiner)) <= self.best_score:
+            return
+
+        if not captains_done:
+            # Distinct heroes, order irrelevant: only pick candidates after the last one
+            for i in range(next_captain, len(self.captains)):
+                candidate = self.captains[i]
+                self.picked_captains.append(candidate)
+                self._push(candidate)
+                self.run(i + 1, next_joiner)
+                self._pop(candidate)
+                self.picked_captains.pop()
+        else:
+            # Joiners may repeat a hero: a multiset, so allow the same index again
+            for i in range(next_joiner, len(self.joiners)):
+                candidate = self.joiners[i]
+                self.picked_joiners.append(candidate)
+                self._push(candidate)
+                self.run(next_captain, i)
+                self._pop(candidate)
+                self.picked_joiners.pop()
+
+
+def optimize_rally(owned=None, joiner_heroes=None, max_level=MAX_LEVEL, skill_caps=None,
+                   effects=None, rule='additive', joiner_slots=TOP_JOINERS,
+                   time_budget=DEFAULT_TIME_BUDGET):
+    """Find the best captain trio plus joiners.
+
+    owned: heroes the captain can field (default: all)
+    joiner_heroes: heroes joiners may bring (default: all)
+    max_level: level cap applied to every skill
+    skill_caps: optional {(hero, skill): max level} overrides
+    effects: optional set of effect names; other skills are ignored
+    rule: 'additive' or 'multiplicative'
+
+    Returns a dict with the captain entries, joiner entries, total,
+    number of search nodes and whether the search finished in time.
+    """
+    if rule not in ('additive', 'multiplicative'):
+        raise ValueError(f"Unknown scoring rule: {rule}")
+    skill_caps = skill_caps or {}
+    captains = _candidates(owned or HEROES, False, max_level, skill_caps, effects)
+    joiners = _candidates(joiner_heroes or HEROES, True, max_level, skill_caps, effects)
+    if not captains:
+        raise ValueError("No captain hero matches those constraints")
+
+    search = _Search(
+        captains,
+        joiners,
+        min(MAX_CAPTAIN_HEROES, len(captains)),
+        joiner_slots if joiners else 0,
+        rule,
+        time.perf_counter() + time_budget
+    )
+    search.run()
+
+    if search.best is None:
+        # Out of time before reaching a leaf: fall back to the greedy pick
+        search.best = (captains[:search.captain_slots], joiners[:1] * search.joiner_slots)
+        search.best_score = -1.0
+    captain_heroes, picked_joiners = search.best
+    if rule == 'additive':
+        total = calculate_rally(captain_heroes, picked_joiners)['total']
+    else:
+        total = float(score_multiplicative(*encode_entries([captain_heroes]), *encode_entries([picked_joiners]))[0])
+    return {
+        'captain_heroes': captain_heroes,
+        'joiners': picked_joiners,
+        'total': total,
+        'rule': rule,
+        'nodes': search.nodes,
+        'complete': not search.timed_out,
+    }
+
+
+def _match_hero(name):
+    for hero in HEROES:
+        if hero.lower() == name.strip().lower():
+            return hero
+    raise ValueError(f"Unknown hero: {name.strip()}")
+
+
+def _hero_list(key, value):
+    heroes = [_match_hero(name) for name in value.split(",") if name.strip()]
+    if not heroes:
+        raise ValueError(f"{key}= needs at least one hero, e.g. `{key}=Chenko,Amadeus`")
+    return heroes
+
+
+def parse_optimize_query(query):
+    """Parse `key=value` options for `!rally optimize` into optimize_rally kwargs.
+
+    heroes=Chenko,Amadeus  joiners=Fahd,Saul  max=4
+    effect=Lethality Up,Attack Up  rule=multiplicative
+    """
+    kwargs = {}
+    query = (query or "").strip()
+    if not query:
+        return kwargs
+    parts = re.split(r"(?:^|\s+)(" + "|".join(OPTIMIZE_KEYS) + r")=", query, flags=re.IGNORECASE)
+    if parts[0].strip():
+        raise ValueError(f"Unexpected text: {parts[0].strip()}")
+    for key, value in zip(parts[1::2], parts[2::2]):
+        key = key.lower()
+        value = value.strip()
+        if key == "heroes":
+            kwargs['owned'] = _hero_list(key, value)
+        elif key == "joiners":
+            kwargs['joiner_heroes'] = _hero_list(key, value)
+        elif key == "max":
+            if not value.isdigit() or not 1 <= int(value) <= MAX_LEVEL:
+                raise ValueError(f"max must be a level between 1 and {MAX_LEVEL}")
+            kwargs['max_level'] = int(value)
+        elif key == "effect":
+            known = {data['effect'].lower(): data['effect'] for skills in HERO_SKILLS.values() for data in skills.values()}
+            effects = set()
+            for name in value.split(","):
+                if name.strip().lower() not in known:
+                    raise ValueError(f"Unknown effect: {name.strip()}")
+                effects.add(known[name.strip().lower()])
+            kwargs['effects'] = effects
+        elif key == "rule":
+            if value.lower() not in ('additive', 'multiplicative'):
+                raise ValueError("rule must be additive or multiplicative")
+            kwargs['rule'] = value.lower()
+    return kwargs
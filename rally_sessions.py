@@ -0,0 +1,247 @@
+"""Channel rally sessions: the captain opens one, every member joins themselves.
+
+    !rally session Chenko:Stand of Arms:5 Amadeus:Battle Ready:4
+
+The captain's heroes come from the one-shot syntax; the bot posts a live
+summary with Join / Leave / Close buttons. Join opens an ephemeral picker
+(hero, then first skill level) for the member who clicked, so nobody
+enters other players' heroes and members fill the rally in parallel.
+
+Sessions are SharedRallyRecords in the bot's SessionStore, one per channel
+(so they are capped and expire like any other server-side session). Each
+click changes only the clicking member's entry and queues a summary edit
+with the edit dispatcher, without awaiting anything in between, so clicks
+are applied one at a time on the event loop and no lock is needed. The
+queued edit is a render callback: the dispatcher merges a burst of clicks
+into one edit, paces it to the channel's rate limits and renders the
+summary once, from the record's latest state, when it sends. No update
+is lost and a crowd of clicks costs a handful of edits and renders.
+
+Component custom_ids are "rally:<action>:<channel id>.<nonce>[.<hero>]";
+the nonce keeps buttons of an earlier session in the channel from
+touching a newer one.
+"""
+import secrets
+
+import discord
+from discord import ui, Interaction
+
+import embed_templates as templates
+from edit_queue import EDITS
+from hero_data import FIRST_SKILL, HEROES, HERO_INDEX
+from instrumentation import embed_section, instrumented
+from rally_engine import rally_status, skill_value
+from rally_syntax import parse_rally_spec
+from rally_views import CUSTOM_ID_PREFIX, StatelessView, build_rally_embed
+from select_catalog import JOINER_HERO_OPTIONS, LEVEL_OPTIONS, WAITING_OPTIONS, select
+from session_store import SharedRallyRecord
+
+# Large rallies are fine: the summary lists the top 4 and the first excluded members only
+MAX_MEMBERS = 200
+
+
+def session_id(record, channel_id):
+    return f"{channel_id}.{record.nonce}"
+
+
+class SessionView(StatelessView):
+    """Buttons under the live summary"""
+
+    def __init__(self, sid):
+        super().__init__()
+        self.add_item(ui.Button(
+            label="Join Rally", style=discord.ButtonStyle.primary, emoji="🤝", custom_id=f"{CUSTOM_ID_PREFIX}:sjoin:{sid}"
+        ))
+        self.add_item(ui.Button(
+            label="Leave", style=discord.ButtonStyle.secondary, custom_id=f"{CUSTOM_ID_PREFIX}:sleave:{sid}"
+        ))
+        self.add_item(ui.Button(
+            label="Close Rally", style=discord.ButtonStyle.danger, emoji="🔒", custom_id=f"{CUSTOM_ID_PREFIX}:sclose:{sid}"
+        ))
+
+
+class JoinPickView(StatelessView):
+    """Ephemeral hero and level selects for one member"""
+
+    def __init__(self, sid, hero=None):
+        super().__init__()
+        self.add_item(select(
+            JOINER_HERO_OPTIONS,
+            f"Your hero: {hero}" if hero else "Choose your hero...",
+            f"{CUSTOM_ID_PREFIX}:shero:{sid}",
+            row=0
+        ))
+        if hero:
+            self.add_item(select(
+                LEVEL_OPTIONS[(hero, FIRST_SKILL[hero])], f"{FIRST_SKILL[hero]} level...", f"{CUSTOM_ID_PREFIX}:slevel:{sid}.{HERO_INDEX[hero]}", row=1
+            ))
+        else:
+            self.add_item(select(WAITING_OPTIONS, "Choose first skill level...", f"{CUSTOM_ID_PREFIX}:slevel:{sid}", row=1, disabled=True))
+
+
+@embed_section
+def session_embed(record):
+    """Live summary: the counted top 4 from the record's heaps, then the first excluded members"""
+    captain_heroes = record.captain_heroes()
+    captain_total = sum(hero['effect'] for hero in captain_heroes)
+    total = captain_total + record.top.total
+    counted = [record.member_entry(user_id) for user_id, _ in record.top.counted()]
+    excluded = record.excluded_members(templates.EXCLUDED_SHOWN)
+    color, status = rally_status(total)
+    if record.closed:
+        footer = "🔒 Closed by the captain"
+    else:
+        footer = "⭐ counts toward the top 4 - click **Join Rally** to add your hero"
+    return templates.SESSION.render(
+        color,
+        captain=record.captain_name,
+        captain_total=captain_total,
+        heroes=templates.captain_hero_lines(captain_heroes, indent="  "),
+        count=len(record.members),
+        limit=MAX_MEMBERS,
+        members=templates.session_member_lines(counted, excluded, record.top.excluded_count - len(excluded)),
+        total=total,
+        status=status,
+        footer=footer,
+    )
+
+
+def publish(record):
+    """Queue a live summary edit, rendered from the record when the dispatcher sends it"""
+    if record.message is not None:
+        EDITS.submit(record.message, embed=lambda: session_embed(record))
+
+
+async def open_session(ctx, store, spec):
+    """Start a session in ctx.channel; raises ValueError with a user-facing message"""
+    if not spec.strip():
+        raise ValueError("Give the captain's heroes: `!rally session Hero:Skill:Level ...`")
+    captain_heroes, joiners = parse_rally_spec(spec)
+    if joiners:
+        raise ValueError("Members join with the button, leave out the `| ...` part")
+
+    channel_id = ctx.channel.id
+    existing = store.get(channel_id)
+    if isinstance(existing, SharedRallyRecord) and not existing.closed:
+        if existing.owner != ctx.author.id:
+            raise ValueError(f"{existing.captain_name} already has a rally session open in this channel")
+        # The captain starting over replaces their own session
+        await close_session(existing, store, channel_id)
+
+    record = SharedRallyRecord(ctx.author.id, ctx.author.display_name, captain_heroes, secrets.token_hex(3))
+    # Stored before sending so a second !rally session can't slip in while we wait on Discord
+    store.put(channel_id, record)
+    try:
+        record.message = await ctx.send(
+            embed=session_embed(record), view=SessionView(session_id(record, channel_id))
+        )
+    except Exception:
+        store.pop(channel_id)
+        raise
+    return record
+
+
+async def close_session(record, store, channel_id):
+    """Mark closed, drop it from the store and turn the summary into the final calculation"""
+    if record.closed:
+        return
+    record.closed = True
+    if store.get(channel_id, touch=False) is record:
+        store.pop(channel_id)
+    if record.message is not None:
+        final = build_rally_embed(record.captain_name, record.captain_heroes(), [e for _, e in record.member_entries()])
+        names = ", ".join(name for name, _ in record.members.values()) or "None"
+        # Embed field values are capped at 1024 characters
+        final.add_field(name="👥 Members", value=names if len(names) <= 1024 else names[:1021] + "...")
+        # Replaces any summary still queued, so the final calculation is what lands
+        EDITS.submit(record.message, embed=final, view=None)
+
+
+@instrumented
+async def join_callback(interaction: Interaction, record, sid, extra, store):
+    await interaction.response.send_message(
+        "Pick your hero and its first skill level:", view=JoinPickView(sid), ephemeral=True
+    )
+
+
+@instrumented
+async def session_hero_callback(interaction: Interaction, record, sid, extra, store):
+    hero = interaction.data['values'][0]
+    await interaction.response.edit_message(
+        content=f"Joining as **{hero}** - pick your {FIRST_SKILL[hero]} level:", view=JoinPickView(sid, hero)
+    )
+
+
+@instrumented
+async def session_level_callback(interaction: Interaction, record, sid, extra, store):
+    hero = HEROES[int(extra)]
+    level = int(interaction.data['values'][0])
+    try:
+        effect = skill_value(hero, FIRST_SKILL[hero], level)
+    except ValueError as e:
+        await interaction.response.edit_message(content=f"⚠️ {e}", view=JoinPickView(sid, hero))
+        return
+
+    user = interaction.user
+    full = user.id not in record.members and len(record.members) >= MAX_MEMBERS
+    if not record.closed and not full:
+        record.set_member(user.id, user.display_name, hero, level)
+        publish(record)
+
+    if record.closed:
+        content = "⚠️ This rally session has been closed"
+    elif full:
+        content = f"⚠️ This rally is full ({MAX_MEMBERS} members)"
+    else:
+        content = f"✅ You're in: **{hero}** Lv{level} (+{effect}%)"
+    await interaction.response.edit_message(content=content, view=None)
+
+
+@instrumented
+async def leave_callback(interaction: Interaction, record, sid, extra, store):
+    removed = record.remove_member(interaction.user.id)
+    if removed:
+        publish(record)
+    await interaction.response.send_message(
+        "👋 You left the rally" if removed else "ℹ️ You haven't joined this rally", ephemeral=True
+    )
+
+
+@instrumented
+async def close_callback(interaction: Interaction, record, sid, extra, store):
+    if interaction.user.id != record.owner:
+        await interaction.response.send_message("⚠️ Only the rally captain can close the session", ephemeral=True)
+        return
+    await close_session(record, store, int(sid.partition(".")[0]))
+    # The summary edit goes through the dispatcher, after any member update still queued
+    await interaction.response.defer()
+
+
+# custom_id action -> handler(interaction, record, session id, extra, store)
+SESSION_ROUTES = {
+    "sjoin": join_callback,
+    "shero": session_hero_callback,
+    "slevel": session_level_callback,
+    "sleave": leave_callback,
+    "sclose": close_callback,
+}
+
+
+async def route_session_interaction(interaction: Interaction, store):
+    """Handle a session component click; returns False if it isn't one of ours"""
+    if interaction.type is not discord.InteractionType.component:
+        return False
+    prefix, _, rest = (interaction.data or {}).get('custom_id', '').partition(":")
+    action, _, encoded = rest.partition(":")
+    if prefix != CUSTOM_ID_PREFIX or action not in SESSION_ROUTES:
+        return False
+
+    channel_id, _, rest = encoded.partition(".")
+    nonce, _, extra = rest.partition(".")
+    record = store.get(int(channel_id)) if channel_id.isdigit() else None
+    if not isinstance(record, SharedRallyRecord) or record.nonce != nonce or record.closed:
+        await interaction.response.send_message("⚠️ This rally session has ended, ask the captain for a new one", ephemeral=True)
+        return True
+
+    await SESSION_ROUTES[action](interaction, record, f"{channel_id}.{nonce}", extra, store)
+    return True
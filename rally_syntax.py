@@ -0,0 +1,71 @@
+"""Parser for the one-shot rally syntax.
+
+    !rally Chenko:Stand of Arms:5 Amadeus:Battle Ready:4 | Fahd:5 Saul:3
+
+Captain heroes come before the `|` as Hero:Skill:Level, joiners after it as
+Hero:Level (joiners always use their first expedition skill). Names are
+matched case-insensitively and validated against HERO_SKILLS.
+"""
+import re
+
+from hero_data import FIRST_SKILL, HEROES, HERO_SKILLS
+from rally_engine import MAX_CAPTAIN_HEROES, make_entry
+
+CAPTAIN_ENTRY = re.compile(r"\s*([^\s:|]+)\s*:\s*([^:|]+?)\s*:\s*(\d+)(?=\s|$)")
+JOINER_ENTRY = re.compile(r"\s*([^\s:|]+)\s*:\s*(\d+)(?=\s|$)")
+
+HERO_NAMES = {hero.lower(): hero for hero in HEROES}
+
+
+def _hero(name):
+    hero = HERO_NAMES.get(name.lower())
+    if hero is None:
+        raise ValueError(f"Unknown hero: {name}")
+    return hero
+
+
+def _skill(hero, name):
+    for skill in HERO_SKILLS[hero]:
+        if skill.lower() == name.lower():
+            return skill
+    raise ValueError(f"{hero} has no skill called {name} (try: {', '.join(HERO_SKILLS[hero])})")
+
+
+def _scan(pattern, text, usage):
+    """Yield regex matches covering all of `text`, or raise on leftovers"""
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = pattern.match(text, position)
+        if match is None:
+            raise ValueError(f"Couldn't read `{text[position:].strip()}` - expected {usage}")
+        yield match
+        position = match.end()
+
+
+def parse_rally_spec(text):
+    """Parse a one-shot rally into (captain_heroes, joiners) entry lists.
+
+    Entries are {'hero', 'skill', 'level', 'effect'} dicts, the same shape
+    the wizard builds. Raises ValueError with a user-facing message.
+    """
+    if text.count("|") > 1:
+        raise ValueError("Use a single `|` between captain heroes and rally members")
+    captain_text, _, joiner_text = text.partition("|")
+
+    captain_heroes = []
+    for match in _scan(CAPTAIN_ENTRY, captain_text, "Hero:Skill:Level"):
+        hero = _hero(match.group(1))
+        if any(entry['hero'] == hero for entry in captain_heroes):
+            raise ValueError(f"{hero} is listed twice for the captain")
+        captain_heroes.append(make_entry(hero, _skill(hero, match.group(2)), int(match.group(3))))
+
+    if not 1 <= len(captain_heroes) <= MAX_CAPTAIN_HEROES:
+        raise ValueError(f"The captain brings 1-{MAX_CAPTAIN_HEROES} heroes")
+
+    joiners = []
+    for match in _scan(JOINER_ENTRY, joiner_text, "Hero:Level"):
+        hero = _hero(match.group(1))
+        joiners.append(make_entry(hero, FIRST_SKILL[hero], int(match.group(2))))
+
+    return captain_heroes, joiners
@@ -0,0 +1,205 @@
+"""Precomputed lookup table of every captain configuration.
+
+Each (hero, skill, level) is an option symbol. A captain of 1-3 distinct
+heroes is a sorted triple of symbols, padded with the two reserved empty
+symbols 0 and 1, so every configuration maps to one row through the
+combinatorial number system: row = C(a, 1) + C(b, 2) + C(c, 3).
+
+The table stores the captain total (uint16) and the per-effect breakdown
+(uint8) for every row. It is written once to RALLY_TABLE_DIR as .npy files
+and memory-mapped on load; a fingerprint of the hero data is kept next to
+it so the table is rebuilt automatically when HEROES or HERO_SKILLS change.
+
+Build it ahead of time with: python rally_table.py
+"""
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+from math import comb
+
+import numpy as np
+
+from hero_data import HEROES, HERO_SKILLS
+
+TABLE_VERSION = 1
+TABLE_DIR = os.getenv("RALLY_TABLE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rally_table"))
+
+EMPTY_SYMBOLS = 2
+INVALID = np.iinfo(np.uint16).max  # total for rows that aren't a legal captain
+
+
+def hero_data_fingerprint():
+    """Hash of the hero catalog; any change invalidates the table"""
+    payload = json.dumps([TABLE_VERSION, HEROES, HERO_SKILLS], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def catalog_options():
+    """Every (hero, skill, level, value, effect) in symbol order (after the empty symbols)"""
+    options = []
+    for hero in HEROES:
+        for skill, data in HERO_SKILLS[hero].items():
+            for level, value in enumerate(data['values'], start=1):
+                options.append((hero, skill, level, value, data['effect']))
+    return options
+
+
+def effect_names():
+    return sorted({data['effect'] for skills in HERO_SKILLS.values() for data in skills.values()})
+
+
+def rank(a, b, c):
+    """Row for the sorted symbol triple a < b < c"""
+    return a + comb(b, 2) + comb(c, 3)
+
+
+def build_arrays():
+    """Enumerate every symbol triple -> (totals, effects) arrays"""
+    options = catalog_options()
+    effects = effect_names()
+    symbols = len(options) + EMPTY_SYMBOLS
+
+    # Per-symbol attributes; empty symbols get distinct negative heroes and no value
+    hero_of = np.array([-1, -2] + [HEROES.index(o[0]) for o in options], dtype=np.int16)
+    value_of = np.array([0, 0] + [o[3] for o in options], dtype=np.int32)
+    effect_of = np.array([0, 0] + [effects.index(o[4]) for o in options], dtype=np.intp)
+
+    triples = np.array(list(itertools.combinations(range(symbols), 3)), dtype=np.int64)
+    a, b, c = triples.T
+    rows = a + b * (b - 1) // 2 + c * (c - 1) * (c - 2) // 6
+
+    # Padding must be canonical: symbol 1 only ever follows symbol 0
+    valid = a != 1
+    heroes = hero_of[triples]
+    valid &= (heroes[:, 0] != heroes[:, 1]) & (heroes[:, 0] != heroes[:, 2]) & (heroes[:, 1] != heroes[:, 2])
+
+    row_count = comb(symbols, 3)
+    totals = np.full(row_count, INVALID, dtype=np.uint16)
+    totals[rows[valid]] = value_of[triples[valid]].sum(axis=1)
+
+    breakdown = np.zeros((row_count, len(effects)), dtype=np.uint8)
+    for column in range(3):
+        real = valid & (triples[:, column] >= EMPTY_SYMBOLS)
+        np.add.at(
+            breakdown,
+            (rows[real], effect_of[triples[real, column]]),
+            value_of[triples[real, column]].astype(np.uint8)
+        )
+    return totals, breakdown
+
+
+def build_table(directory=TABLE_DIR):
+    """Write the table files to `directory`, replacing any existing table"""
+    totals, breakdown = build_arrays()
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".rally_table-", dir=parent)
+    try:
+        np.save(os.path.join(staging, "totals.npy"), totals)
+        np.save(os.path.join(staging, "effects.npy"), breakdown)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({
+                'fingerprint': hero_data_fingerprint(),
+                'effects': effect_names(),
+                'rows': int(totals.shape[0]),
+            }, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+class RallyTable:
+    """Memory-mapped captain totals and per-effect breakdowns"""
+
+    def __init__(self, totals, breakdown, effects):
+        self.totals = totals
+        self.breakdown = breakdown
+        self.effects = effects
+        self.by_level = {}
+        self.by_value = {}
+        for symbol, (hero, skill, level, value, _) in enumerate(catalog_options(), start=EMPTY_SYMBOLS):
+            self.by_level[(hero, skill, level)] = symbol
+            # Skill values rise with level, so the value identifies the level too
+            self.by_value[(hero, skill, value)] = symbol
+
+    def row(self, captain_heroes):
+        """Row for a list of {'hero', 'skill', 'effect'} (or 'level') dicts"""
+        if not 1 <= len(captain_heroes) <= 3:
+            raise ValueError("A captain brings 1-3 heroes")
+        symbols = []
+        for entry in captain_heroes:
+            if 'level' in entry:
+                symbol = self.by_level.get((entry['hero'], entry['skill'], entry['level']))
+            else:
+                symbol = self.by_value.get((entry['hero'], entry['skill'], entry['effect']))
+            if symbol is None:
+                raise ValueError(f"Unknown skill level: {entry['hero']} - {entry['skill']}")
+            symbols.append(symbol)
+        # A repeated symbol would rank as some other, valid captain
+        if len(set(symbols)) < len(symbols):
+            raise ValueError("Captain heroes must be distinct")
+        a, b, c = sorted([0, 1][:3 - len(symbols)] + symbols)
+        row = rank(a, b, c)
+        if self.totals[row] == INVALID:
+            raise ValueError("Captain heroes must be distinct")
+        return row
+
+    def captain_total(self, captain_heroes):
+        return int(self.totals[self.row(captain_heroes)])
+
+    def effect_breakdown(self, captain_heroes):
+        """{effect name: percentage} for the effects this captain provides"""
+        values = self.breakdown[self.row(captain_heroes)]
+        return {name: int(value) for name, value in zip(self.effects, values) if value}
+
+
+def load_table(directory=TABLE_DIR):
+    """Memory-map the table, rebuilding it first if the hero data changed.
+
+    Falls back to an in-memory table if the directory isn't writable.
+    """
+    meta_path = os.path.join(directory, "meta.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        stale = meta.get('fingerprint') != hero_data_fingerprint()
+    except (OSError, ValueError):
+        stale = True
+
+    if stale:
+        try:
+            print("🔨 Building rally lookup table...")
+            build_table(directory)
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except OSError as e:
+            print(f"⚠️ Could not write rally table ({e}), keeping it in memory")
+            totals, breakdown = build_arrays()
+            return RallyTable(totals, breakdown, effect_names())
+
+    return RallyTable(
+        np.load(os.path.join(directory, "totals.npy"), mmap_mode="r"),
+        np.load(os.path.join(directory, "effects.npy"), mmap_mode="r"),
+        meta['effects']
+    )
+
+
+_table = None
+
+
+def get_table():
+    """Process-wide table, loaded on first use"""
+    global _table
+    if _table is None:
+        _table = load_table()
+    return _table
+
+
+if __name__ == "__main__":
+    build_table()
+    print(f"✅ Rally table written to {TABLE_DIR}")
@@ -0,0 +1,495 @@
+"""Rally Calculator wizard views.
+
+Each captain hero or rally member is configured on a single screen: the
+hero, skill and level selects sit in separate action rows of one view.
+
+The wizard keeps no per-session objects in memory. Every component
+carries the partial rally in its custom_id ("rally:<action>:<state>"), so
+a click is handled by decoding the state, applying the pick and rendering
+the next screen with freshly encoded ids. Views sent this way are stopped
+before sending, so py-cord never keeps them in its view store; clicks are
+routed back through route_interaction(), which main.py hooks into
+on_interaction. Only the entry button has a fixed custom_id, and its one
+RallyCalculatorView instance is registered with bot.add_view at startup.
+In-flight rallies therefore survive restarts.
+"""
+import functools
+import os
+import string
+
+import discord
+from discord import ui, Interaction
+
+import embed_templates as templates
+from hero_data import (
+    CAPTAIN_OPTION_CODES, CAPTAIN_OPTIONS, FIRST_SKILL, HERO_INDEX, HEROES, HERO_SKILLS,
+    joiner_code, joiner_from_code
+)
+from instrumentation import embed_section, instrumented
+from metrics import RESULT_CACHE_ENTRIES, RESULT_CACHE_HITS, RESULT_CACHE_MISSES
+from rally_engine import MAX_CAPTAIN_HEROES, calculate_rally, make_entry, rally_status, split_joiners
+from rally_table import get_table
+from select_catalog import (
+    CAPTAIN_HERO_OPTIONS, HERO_COUNT_OPTIONS, JOINER_COUNT_OPTIONS, JOINER_HERO_OPTIONS,
+    LEVEL_OPTIONS, MAX_WIZARD_JOINERS, SKILL_OPTIONS, WAITING_OPTIONS, select
+)
+
+CUSTOM_ID_PREFIX = "rally"
+START_CUSTOM_ID = "rally:start"
+
+# Rendered results kept per canonical composition (see rally_summary)
+RESULT_CACHE_SIZE = int(os.getenv("RALLY_RESULT_CACHE", "1024"))
+
+# One character per small integer; "-" marks an empty pending pick
+ALPHABET = string.digits + string.ascii_letters
+EMPTY = "-"
+
+# Captain entries take two characters (136 option codes), joiners one (60 codes);
+# the member count is one ALPHABET character (up to MAX_WIZARD_JOINERS) and the
+# owner's user id is written in ALPHABET digits (11 characters for a snowflake)
+
+
+def _to_alphabet(number):
+    digits = ""
+    while True:
+        number, digit = divmod(number, len(ALPHABET))
+        digits = ALPHABET[digit] + digits
+        if not number:
+            return digits
+
+
+def _from_alphabet(digits):
+    number = 0
+    for char in digits:
+        number = number * len(ALPHABET) + ALPHABET.index(char)
+    return number
+
+
+class RallyState:
+    """Partial rally decoded from (and encoded back into) a custom_id"""
+    __slots__ = ('owner', 'hero_count', 'joiner_count', 'captain_heroes', 'joiners', 'hero', 'skill', 'level')
+
+    def __init__(self, owner=None, hero_count=0, joiner_count=0, captain_heroes=None, joiners=None,
+                 hero=None, skill=None, level=None):
+        # User id of the member who started the rally; only they may click its components
+        self.owner = owner
+        self.hero_count = hero_count
+        self.joiner_count = joiner_count
+        self.captain_heroes = captain_heroes or []  # [{'hero', 'skill', 'level', 'effect'}, ...]
+        self.joiners = joiners or []
+        # Pending picks for the slot on screen
+        self.hero = hero
+        self.skill = skill
+        self.level = level
+
+    def encode(self):
+        captains = "".join(
+            ALPHABET[code // len(ALPHABET)] + ALPHABET[code % len(ALPHABET)]
+            for code in (CAPTAIN_OPTION_CODES[(e['hero'], e['skill'], e['level'])] for e in self.captain_heroes)
+        )
+        joiners = "".join(ALPHABET[joiner_code(e['hero'], e['level'])] for e in self.joiners)
+        pending = (
+            (ALPHABET[HERO_INDEX[self.hero]] if self.hero else EMPTY)
+            + (ALPHABET[list(HERO_SKILLS[self.hero]).index(self.skill)] if self.skill else EMPTY)
+            + (str(self.level) if self.level else EMPTY)
+        )
+        owner = "" if self.owner is None else "." + _to_alphabet(self.owner)
+        return f"{self.hero_count}{ALPHABET[self.joiner_count]}{captains}.{joiners}.{pending}{owner}"
+
+    @classmethod
+    def decode(cls, encoded):
+        """Inverse of encode(); raises ValueError for anything malformed"""
+        try:
+            # Rallies started before owners were encoded have no fourth part
+            head, joiners, pending, *owner = encoded.split(".")
+            state = cls(_from_alphabet(owner[0]) if owner else None, int(head[0]), ALPHABET.index(head[1]))
+            captains = head[2:]
+            for i in range(0, len(captains), 2):
+                code = ALPHABET.index(captains[i]) * len(ALPHABET) + ALPHABET.index(captains[i + 1])
+                state.captain_heroes.append(make_entry(*CAPTAIN_OPTIONS[code]))
+            for char in joiners:
+                hero, level = joiner_from_code(ALPHABET.index(char))
+                state.joiners.append(make_entry(hero, FIRST_SKILL[hero], level))
+            if pending[0] != EMPTY:
+                state.hero = HEROES[ALPHABET.index(pending[0])]
+            if pending[1] != EMPTY:
+                state.skill = list(HERO_SKILLS[state.hero])[ALPHABET.index(pending[1])]
+            if pending[2] != EMPTY:
+                state.level = int(pending[2])
+        except (IndexError, KeyError, TypeError, ValueError):
+            raise ValueError(f"Malformed rally state: {encoded!r}")
+        if len(owner) > 1 or not (0 <= state.hero_count <= MAX_CAPTAIN_HEROES and 0 <= state.joiner_count <= MAX_WIZARD_JOINERS):
+            raise ValueError(f"Malformed rally state: {encoded!r}")
+        return state
+
+    def custom_id(self, action):
+        return f"{CUSTOM_ID_PREFIX}:{action}:{self.encode()}"
+
+
+def entry_key(e):
+    return e['hero'], e['skill'], e['level']
+
+
+@functools.lru_cache(maxsize=RESULT_CACHE_SIZE)
+def rally_summary(captain_key, joiner_key):
+    """Rendered final calculation for a canonical rally (sorted entry keys).
+
+    Returns (head, hero rows, member rows, tail, color): everything but the
+    order of the lines, with each entry's row text keyed by entry_key().
+    """
+    captain_heroes = [make_entry(*key) for key in captain_key]
+    joiners = [make_entry(*key) for key in joiner_key]
+    # Captain total is additive, top 4 joiner skills are added on top
+    result = calculate_rally(captain_heroes, joiners)
+    color, status = rally_status(result['total'])
+    return (
+        f" (+{result['captain_total']}%)",
+        {key: templates.hero_row(e) for key, e in zip(captain_key, captain_heroes)},
+        {key: templates.member_row(e) for key, e in zip(joiner_key, joiners)},
+        templates.result_tail(result['captain_total'], len(joiners) + 1, result['joiner_total'], result['total'], status),
+        color,
+    )
+
+
+RESULT_CACHE_HITS.set_function(lambda: rally_summary.cache_info().hits)
+RESULT_CACHE_MISSES.set_function(lambda: rally_summary.cache_info().misses)
+RESULT_CACHE_ENTRIES.set_function(lambda: rally_summary.cache_info().currsize)
+
+
+@embed_section
+def build_rally_embed(captain, captain_heroes, joiners):
+    """Final calculation embed shared by the wizard and the one-shot syntax"""
+    # Same heroes in any order share one cache entry; only the name and line order differ per call
+    captain_keys = [entry_key(e) for e in captain_heroes]
+    head, hero_rows, member_rows, tail, color = rally_summary(
+        tuple(sorted(captain_keys)), tuple(sorted(entry_key(e) for e in joiners))
+    )
+    counted, excluded = split_joiners(joiners)
+    body = (
+        head
+        + templates.result_hero_lines([hero_rows[key] for key in captain_keys])
+        + templates.top_member_lines([member_rows[entry_key(e)] for e in counted])
+        + templates.excluded_lines([member_rows[entry_key(e)] for e in excluded[:templates.EXCLUDED_SHOWN]], len(excluded))
+        + tail
+    )
+    return templates.RALLY_RESULT.render(color, captain=captain, body=body)
+
+
+# Rally Calculator UI Classes
+class StatelessView(ui.View):
+    """Components only: stopped up front so py-cord never stores it"""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+        # Clicks come back through route_interaction, not through this object
+        self.stop()
+
+
+class RallyCalculatorView(ui.View):
+    """Persistent entry point; one instance is registered with bot.add_view"""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+        # Add simple button to start with default captain name
+        start_button = ui.Button(
+            label="Start Rally Setup",
+            style=discord.ButtonStyle.primary,
+            emoji="⚔️",
+            custom_id=START_CUSTOM_ID
+        )
+        start_button.callback = self.start_setup_callback
+        self.add_item(start_button)
+
+    @classmethod
+    def detached(cls):
+        """Copy for sending; clicks are handled by the registered instance"""
+        view = cls()
+        view.stop()
+        return view
+
+    @instrumented
+    async def start_setup_callback(self, interaction: Interaction):
+        # Use the Discord username as captain name
+        captain_name = interaction.user.display_name
+
+        embed = templates.CAPTAIN_SETUP.render(captain=captain_name)
+
+        # Switch to hero count selection
+        await interaction.response.edit_message(embed=embed, view=HeroCountView(interaction.user.id))
+
+
+class HeroCountView(StatelessView):
+    def __init__(self, owner):
+        super().__init__()
+        # Add hero count selection (1-3)
+        self.add_item(select(HERO_COUNT_OPTIONS, "Choose number of heroes...", RallyState(owner).custom_id("hc")))
+
+
+class CaptainMultiHeroView(StatelessView):
+    """Hero, skill and level selects for the current captain slot, one per row"""
+
+    def __init__(self, state):
+        super().__init__()
+        slot = len(state.captain_heroes) + 1
+        self.add_item(select(
+            CAPTAIN_HERO_OPTIONS,
+            f"Captain hero #{slot}: {state.hero}" if state.hero else f"Choose captain hero #{slot}...",
+            state.custom_id("ch"),
+            row=0
+        ))
+        if state.hero:
+            self.add_item(select(
+                SKILL_OPTIONS[state.hero],
+                f"Skill: {state.skill}" if state.skill else f"Choose {state.hero}'s expedition skill...",
+                state.custom_id("cs"),
+                row=1
+            ))
+        else:
+            self.add_item(select(WAITING_OPTIONS, "Choose expedition skill...", state.custom_id("cs"), row=1, disabled=True))
+        if state.hero and state.skill:
+            self.add_item(select(
+                LEVEL_OPTIONS[(state.hero, state.skill)],
+                f"Level {state.level}" if state.level else "Choose skill level...",
+                state.custom_id("cl"),
+                row=2
+            ))
+        else:
+            self.add_item(select(WAITING_OPTIONS, "Choose skill level...", state.custom_id("cl"), row=2, disabled=True))
+
+
+class JoinerCountView(StatelessView):
+    def __init__(self, state):
+        super().__init__()
+        self.add_item(select(JOINER_COUNT_OPTIONS, "How many rally members? (top 4 skills count)", state.custom_id("jc")))
+
+
+# Joiner Pool Configuration Class (implements 4 highest-level first skills rule)
+class JoinerPoolConfigView(StatelessView):
+    """Hero and level selects for the current member; the skill is always the first one"""
+
+    def __init__(self, state):
+        super().__init__()
+        slot = len(state.joiners) + 1
+        self.add_item(select(
+            JOINER_HERO_OPTIONS,
+            f"Rally member #{slot}: {state.hero}" if state.hero else f"Choose rally member #{slot} hero...",
+            state.custom_id("jh"),
+            row=0
+        ))
+        if state.hero:
+            self.add_item(select(
+                LEVEL_OPTIONS[(state.hero, FIRST_SKILL[state.hero])],
+                f"Level {state.level}" if state.level else "Choose first skill level...",
+                state.custom_id("jl"),
+                row=1
+            ))
+        else:
+            self.add_item(select(WAITING_OPTIONS, "Choose first skill level...", state.custom_id("jl"), row=1, disabled=True))
+
+
+class RallyResultView(StatelessView):
+    def __init__(self, owner):
+        super().__init__()
+        # Add new rally button
+        self.add_item(ui.Button(
+            label="Calculate New Rally",
+            style=discord.ButtonStyle.primary,
+            emoji="🆕",
+            custom_id=RallyState(owner).custom_id("new")
+        ))
+
+
+@embed_section
+def captain_slot_embed(captain, state, warning=None):
+    return templates.CAPTAIN_SLOT.render(
+        captain=captain,
+        configured=len(state.captain_heroes),
+        total=state.hero_count,
+        entries=templates.entry_lines(state.captain_heroes, "Hero"),
+        slot=len(state.captain_heroes) + 1,
+        warning=templates.warning_line(warning),
+    )
+
+
+@embed_section
+def joiner_slot_embed(captain, state, warning=None):
+    return templates.JOINER_SLOT.render(
+        captain=captain,
+        configured=len(state.joiners),
+        total=state.joiner_count,
+        entries=templates.entry_lines(state.joiners, "Member"),
+        slot=len(state.joiners) + 1,
+        warning=templates.warning_line(warning),
+    )
+
+
+@instrumented
+async def hero_count_callback(interaction: Interaction, state):
+    state.hero_count = int(interaction.data['values'][0])
+
+    # Switch straight to the first captain hero slot
+    captain = interaction.user.display_name
+    await interaction.response.edit_message(embed=captain_slot_embed(captain, state), view=CaptainMultiHeroView(state))
+
+
+@instrumented
+async def captain_hero_callback(interaction: Interaction, state):
+    # A new hero resets the skill and level picked for the slot
+    state.hero = interaction.data['values'][0]
+    state.skill = None
+    state.level = None
+    await complete_captain_slot(interaction, state)
+
+
+@instrumented
+async def captain_skill_callback(interaction: Interaction, state):
+    state.skill = interaction.data['values'][0].split('|')[1]
+    await complete_captain_slot(interaction, state)
+
+
+@instrumented
+async def captain_effect_callback(interaction: Interaction, state):
+    state.level = int(interaction.data['values'][0])
+    await complete_captain_slot(interaction, state)
+
+
+@instrumented
+async def complete_captain_slot(interaction: Interaction, state):
+    """Save the slot once hero, skill and level are all picked"""
+    captain = interaction.user.display_name
+    warning = None
+    if state.hero and state.skill and state.level:
+        try:
+            # Save this captain hero
+            state.captain_heroes.append(make_entry(state.hero, state.skill, state.level))
+            state.hero = state.skill = state.level = None
+        except ValueError as e:
+            warning = str(e)
+            state.level = None
+
+    # Check if we need more captain heroes
+    if len(state.captain_heroes) < state.hero_count:
+        await interaction.response.edit_message(embed=captain_slot_embed(captain, state, warning), view=CaptainMultiHeroView(state))
+    else:
+        # All captain heroes configured, show summary and move to joiners
+        await show_captain_summary(interaction, state)
+
+
+@embed_section
+def captain_summary_embed(captain, state):
+    # Calculate captain total (additive) from the lookup table
+    try:
+        captain_total = get_table().captain_total(state.captain_heroes)
+        captain_effects = get_table().effect_breakdown(state.captain_heroes)
+    except ValueError:
+        # Same hero picked twice isn't in the table, add it up by hand
+        captain_total = sum(hero['effect'] for hero in state.captain_heroes)
+        captain_effects = {}
+
+    return templates.CAPTAIN_SUMMARY.render(
+        captain=captain,
+        heroes=templates.captain_hero_lines(state.captain_heroes),
+        effects=templates.effect_lines(captain_effects),
+        total=captain_total,
+    )
+
+
+@instrumented
+async def show_captain_summary(interaction: Interaction, state):
+    embed = captain_summary_embed(interaction.user.display_name, state)
+
+    # Add joiner count selection
+    await interaction.response.edit_message(embed=embed, view=JoinerCountView(state))
+
+
+@instrumented
+async def joiner_count_callback(interaction: Interaction, state):
+    state.joiner_count = int(interaction.data['values'][0])
+
+    # Switch straight to the first rally member slot
+    captain = interaction.user.display_name
+    await interaction.response.edit_message(embed=joiner_slot_embed(captain, state), view=JoinerPoolConfigView(state))
+
+
+@instrumented
+async def joiner_hero_callback(interaction: Interaction, state):
+    state.hero = interaction.data['values'][0]
+    await complete_joiner_slot(interaction, state)
+
+
+@instrumented
+async def joiner_effect_callback(interaction: Interaction, state):
+    state.level = int(interaction.data['values'][0])
+    await complete_joiner_slot(interaction, state)
+
+
+@instrumented
+async def complete_joiner_slot(interaction: Interaction, state):
+    """Save the member once hero and level are both picked"""
+    captain = interaction.user.display_name
+    warning = None
+    if state.hero and state.level:
+        try:
+            # Get the first expedition skill for this hero (PDF rule)
+            state.joiners.append(make_entry(state.hero, FIRST_SKILL[state.hero], state.level))
+            state.hero = state.level = None
+        except ValueError as e:
+            warning = str(e)
+            state.level = None
+
+    # Check if we need more joiners
+    if len(state.joiners) < state.joiner_count:
+        await interaction.response.edit_message(embed=joiner_slot_embed(captain, state, warning), view=JoinerPoolConfigView(state))
+    else:
+        # All joiners configured, calculate final rally
+        await show_final_rally_calculation(interaction, state)
+
+
+@instrumented
+async def show_final_rally_calculation(interaction: Interaction, state):
+    embed = build_rally_embed(interaction.user.display_name, state.captain_heroes, state.joiners)
+    await interaction.response.edit_message(embed=embed, view=RallyResultView(state.owner))
+
+
+@instrumented
+async def reset_callback(interaction: Interaction, state):
+    # Start a completely new rally calculation
+    embed = templates.RESET.render()
+    await interaction.response.edit_message(embed=embed, view=RallyCalculatorView.detached())
+
+
+# custom_id action -> handler(interaction, state)
+ROUTES = {
+    "hc": hero_count_callback,
+    "ch": captain_hero_callback,
+    "cs": captain_skill_callback,
+    "cl": captain_effect_callback,
+    "jc": joiner_count_callback,
+    "jh": joiner_hero_callback,
+    "jl": joiner_effect_callback,
+    "new": reset_callback,
+}
+
+
+async def route_interaction(interaction: Interaction):
+    """Handle a wizard component click; returns False if it isn't one of ours"""
+    if interaction.type is not discord.InteractionType.component:
+        return False
+    prefix, _, rest = (interaction.data or {}).get('custom_id', '').partition(":")
+    action, has_state, encoded = rest.partition(":")
+    # Fixed ids (the start button) are dispatched by the registered view
+    if prefix != CUSTOM_ID_PREFIX or not has_state or action not in ROUTES:
+        return False
+
+    try:
+        state = RallyState.decode(encoded)
+    except ValueError:
+        await interaction.response.send_message("⚠️ This rally can't be continued, start a new one with `!rally`", ephemeral=True)
+        return True
+    if state.owner is not None and state.owner != interaction.user.id:
+        await interaction.response.send_message("⚠️ Only the captain who started this rally can change it, start your own with `!rally`", ephemeral=True)
+        return True
+
+    await ROUTES[action](interaction, state)
+    return True
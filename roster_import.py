@@ -0,0 +1,344 @@
+"""Streaming alliance roster import for `!rally import`.
+
+    !rally import Chenko:Stand of Arms:5     (with roster.csv attached)
+
+The attachment is read from Discord's CDN in chunks and parsed as it
+arrives. Nothing holds the whole file or a dict per row:
+- CSV: one member per line, `name,hero,level` (a header row naming the
+  columns is optional; `hero,level` without names works too)
+- JSON: JSON Lines, or an array of member objects
+  (`{"name": ..., "hero": ..., "level": ...}`), decoded object by object
+
+Each valid row goes straight into a TopJoiners roster keyed by member name
+(a later row for the same name replaces the earlier one), so the result
+is the counted top 4 and running total without sorting the alliance.
+Invalid rows are counted and the first few reported with their line
+numbers. The parser yields to the event loop every few hundred rows so a
+large file never stalls other commands.
+
+`!rally assign N` reads the same formats into a HeroRoster instead: one
+row per member and hero, since captains bring up to 3 of their heroes.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import re
+from collections import Counter
+
+import aiohttp
+
+import embed_templates as templates
+import rally_assign
+import workers
+from hero_data import FIRST_SKILL, joiner_code, joiner_from_code
+from rally_engine import rally_status, skill_value
+from rally_syntax import HERO_NAMES, parse_rally_spec
+from top_joiners import TopJoiners
+
+MAX_IMPORT_BYTES = 1024 * 1024
+MAX_IMPORT_ROWS = 5000
+MAX_JSON_OBJECT = 4096  # characters one member object may span before we give up on it
+CHUNK_SIZE = 16 * 1024
+YIELD_EVERY = 250  # rows parsed between event-loop yields
+ERRORS_SHOWN = 5
+
+NAME_COLUMNS = ("name", "member", "player")
+JSON_SEPARATORS = re.compile(r"[ \t\r\n,\[\]]*")  # between member objects
+MAX_NAME_CHARS = 32  # Discord's nickname limit; longer names would overflow embed limits
+
+
+def member_name(name):
+    """Display name from a roster cell, trimmed to MAX_NAME_CHARS ("" if blank)"""
+    return str(name).strip()[:MAX_NAME_CHARS] if name is not None else ""
+
+
+def _shown(value):
+    """A rejected cell as quoted in error lines, trimmed like names"""
+    value = str(value)
+    return value if len(value) <= MAX_NAME_CHARS else value[:MAX_NAME_CHARS - 3] + "..."
+
+
+class _RosterRows:
+    """Row bookkeeping and validation shared by the roster accumulators"""
+
+    def __init__(self):
+        self.rows = 0
+        self.replaced = 0
+        self.invalid = 0
+        self.errors = []  # first ERRORS_SHOWN "line N: ..." messages
+
+    def error(self, line_no, message):
+        self.invalid += 1
+        if len(self.errors) < ERRORS_SHOWN:
+            self.errors.append(f"line {line_no}: {message}")
+
+    def validate(self, line_no, hero_name, level):
+        """(hero, level, first skill effect), or None after recording the error"""
+        self.rows += 1
+        if self.rows > MAX_IMPORT_ROWS:
+            raise ValueError(f"Rosters are limited to {MAX_IMPORT_ROWS} rows")
+        hero = HERO_NAMES.get(str(hero_name).strip().lower())
+        if hero is None:
+            self.error(line_no, f"unknown hero `{_shown(hero_name)}`")
+            return None
+        # Whole numbers only: int() would turn 3.7 into 3 and True into 1
+        if isinstance(level, str) and level.strip().isascii() and level.strip().isdigit():
+            level = int(level)
+        elif type(level) is not int:
+            self.error(line_no, f"level `{_shown(level)}` isn't a whole number")
+            return None
+        try:
+            effect = skill_value(hero, FIRST_SKILL[hero], level)
+        except ValueError as e:
+            self.error(line_no, str(e))
+            return None
+        return hero, level, effect
+
+
+class RosterImport(_RosterRows):
+    """One hero per member: names, one joiner code per member and the top 4"""
+
+    def __init__(self):
+        super().__init__()
+        self.members = {}  # name key -> (display name, joiner code)
+        self.top = TopJoiners()
+        self.heroes = Counter()
+
+    def add(self, line_no, name, hero_name, level):
+        row = self.validate(line_no, hero_name, level)
+        if row is None:
+            return
+        hero, level, effect = row
+
+        name = member_name(name) or f"Row {line_no}"
+        key = name.lower()
+        previous = self.members.get(key)
+        if previous is not None:
+            self.replaced += 1
+            self.heroes[joiner_from_code(previous[1])[0]] -= 1
+        self.members[key] = (name, joiner_code(hero, level))
+        self.heroes[hero] += 1
+        self.top.add(key, effect)
+
+    def counted(self):
+        """[(name, hero, level, effect)] of the top 4, best first"""
+        counted = []
+        for key, effect in self.top.counted():
+            name, code = self.members[key]
+            hero, level = joiner_from_code(code)
+            counted.append((name, hero, level, effect))
+        return counted
+
+
+class HeroRoster(_RosterRows):
+    """Every hero each member owns, for `!rally assign` (one row per member and hero)"""
+
+    def __init__(self):
+        super().__init__()
+        self.members = {}  # name key -> (display name, {hero: first skill level})
+
+    def add(self, line_no, name, hero_name, level):
+        row = self.validate(line_no, hero_name, level)
+        if row is None:
+            return
+        hero, level, _ = row
+        name = member_name(name)
+        if not name:
+            self.error(line_no, "a member name is needed to group heroes")
+            return
+        display, heroes = self.members.setdefault(name.lower(), (name, {}))
+        if hero in heroes:
+            self.replaced += 1
+        heroes[hero] = level
+
+    def owned(self):
+        """[(name, ((hero, level), ...))] in a picklable form for the worker pool"""
+        return [(name, tuple(heroes.items())) for name, heroes in self.members.values()]
+
+
+async def attachment_chunks(attachment, chunk_size=CHUNK_SIZE):
+    """Raw bytes of a Discord attachment, streamed from its URL"""
+    if attachment.size > MAX_IMPORT_BYTES:
+        raise ValueError(f"{attachment.filename} is {attachment.size // 1024} KiB, the limit is {MAX_IMPORT_BYTES // 1024} KiB")
+    received = 0
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(chunk_size):
+                # The reported size is only a hint, so the bytes are counted too
+                received += len(chunk)
+                if received > MAX_IMPORT_BYTES:
+                    raise ValueError(f"{attachment.filename} is over the {MAX_IMPORT_BYTES // 1024} KiB limit")
+                yield chunk
+
+
+async def text_chunks(chunks):
+    """Decode UTF-8 (with or without a BOM) across chunk boundaries"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def text_lines(chunks):
+    """(line number, line) pairs from decoded text chunks"""
+    pending = ""
+    line_no = 0
+    async for text in chunks:
+        lines = (pending + text).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+    if pending:
+        yield line_no + 1, pending.rstrip("\r")
+
+
+async def read_csv(chunks, roster):
+    columns = None
+    parsed = 0
+    async for line_no, line in text_lines(text_chunks(chunks)):
+        if not line.strip():
+            continue
+        # Each line is one record, so quoted names with commas still parse
+        row = [cell.strip() for cell in next(csv.reader([line]))]
+        if columns is None:
+            lowered = [cell.lower() for cell in row]
+            if "hero" in lowered:
+                # Header row: pick the columns by name
+                if "level" not in lowered:
+                    raise ValueError(f"The header on line {line_no} needs a `level` column next to `hero`")
+                name = next((lowered.index(column) for column in NAME_COLUMNS if column in lowered), None)
+                columns = (name, lowered.index("hero"), lowered.index("level"))
+                continue
+            columns = (0, 1, 2) if len(row) >= 3 else (None, 0, 1)
+        name, hero, level = columns
+        try:
+            roster.add(line_no, row[name] if name is not None else None, row[hero], row[level])
+        except IndexError:
+            roster.error(line_no, f"expected {3 if name is not None else 2} columns")
+        parsed += 1
+        if parsed % YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+
+
+async def read_json(chunks, roster):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0  # start of the unparsed text in buffer
+    line_no = 1  # line `position` is on, for error messages
+    parsed = 0
+    async for text in text_chunks(chunks):
+        # Only the unparsed tail (at most one partial object) is copied per chunk
+        buffer = buffer[position:] + text
+        position = 0
+        while True:
+            # Skip whitespace, array brackets and separators between objects
+            start = position
+            position = JSON_SEPARATORS.match(buffer, position).end()
+            line_no += buffer.count("\n", start, position)
+            if position == len(buffer):
+                break
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if len(buffer) - position > MAX_JSON_OBJECT:
+                    raise ValueError(f"Couldn't read the JSON near line {line_no}, expected member objects")
+                break  # wait for the rest of the object
+            if isinstance(item, dict):
+                name = next((item[column] for column in NAME_COLUMNS if column in item), None)
+                roster.add(line_no, name, item.get("hero"), item.get("level"))
+            else:
+                roster.error(line_no, "expected an object with hero and level")
+            line_no += buffer.count("\n", position, end)
+            position = end
+            parsed += 1
+            if parsed % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+    if buffer[position:].strip():
+        raise ValueError(f"The JSON ends in the middle of a member object (line {line_no})")
+
+
+async def read_roster(filename, chunks, roster=None):
+    """Parse a roster by file extension into `roster` (default: a new RosterImport)"""
+    roster = RosterImport() if roster is None else roster
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension in ("json", "jsonl"):
+        await read_json(chunks, roster)
+    elif extension in ("csv", "txt"):
+        await read_csv(chunks, roster)
+    else:
+        raise ValueError("Attach a .csv or .json roster")
+    return roster
+
+
+def roster_embed(filename, captain, captain_heroes, roster):
+    captain_total = sum(hero['effect'] for hero in captain_heroes)
+    total = captain_total + roster.top.total
+    color, status = rally_status(total)
+    notes = f", {roster.replaced} repeated names kept their last row" if roster.replaced else ""
+    if roster.invalid:
+        notes += f", {roster.invalid} rows skipped" + "".join(f"\n  - {error}" for error in roster.errors)
+    return templates.ROSTER_IMPORT.render(
+        color,
+        filename=filename,
+        members=len(roster.members),
+        notes=notes,
+        captain=templates.roster_captain_line(captain, captain_total, captain_heroes),
+        counted=templates.roster_member_lines(roster.counted()),
+        excluded=roster.top.excluded_count,
+        heroes=", ".join(f"{hero} {count}" for hero, count in roster.heroes.most_common() if count),
+        joiner_total=roster.top.total,
+        total=total,
+        status=status,
+    )
+
+
+async def import_roster(attachment, captain, captain_spec=""):
+    """Embed for `!rally import`; raises ValueError with a user-facing message"""
+    captain_heroes = []
+    if captain_spec.strip():
+        captain_heroes, joiners = parse_rally_spec(captain_spec)
+        if joiners:
+            raise ValueError("Members come from the attachment, leave out the `| ...` part")
+    roster = await read_roster(attachment.filename, attachment_chunks(attachment))
+    if not roster.members:
+        raise ValueError(f"No valid members in {attachment.filename}" + "".join(f"\n{e}" for e in roster.errors))
+    return roster_embed(attachment.filename, captain, captain_heroes, roster)
+
+
+def assignment_embed(filename, roster, result):
+    embed = templates.ASSIGNMENT.render(
+        rally_status(result['total'] / len(result['rallies']))[0],
+        filename=filename,
+        members=len(roster.members),
+        rallies=len(result['rallies']),
+        total=result['total'],
+        unassigned=result['unassigned'],
+        notes=templates.assignment_notes(result['optimal'], result['balanced'], roster.invalid, roster.errors),
+    )
+    for i, rally in enumerate(result['rallies'], 1):
+        name = f"⚔️ Rally {i}: {rally['captain']} - {rally['total']}% ({rally_status(rally['total'])[1]})"
+        value = templates.assigned_rally_lines(rally)
+        # Embed field names are capped at 256 characters and values at 1024
+        embed.add_field(
+            name=name if len(name) <= 256 else name[:253] + "...",
+            value=value if len(value) <= 1024 else value[:1021] + "...",
+            inline=False
+        )
+    return embed
+
+
+async def assign_roster(attachment, rallies, time_budget=rally_assign.DEFAULT_TIME_BUDGET):
+    """Embed for `!rally assign N`; raises ValueError with a user-facing message"""
+    if not 1 <= rallies <= rally_assign.MAX_RALLIES:
+        raise ValueError(f"Choose between 1 and {rally_assign.MAX_RALLIES} rallies")
+    roster = await read_roster(attachment.filename, attachment_chunks(attachment), HeroRoster())
+    # The search is CPU-bound: it runs in the worker pool with its own time budget
+    result = await workers.run(rally_assign.assign_rallies, roster.owned(), rallies, time_budget=time_budget)
+    return assignment_embed(attachment.filename, roster, result)
@@ -0,0 +1,78 @@
+"""SelectOption sets for the rally wizard, built once at import.
+
+The hero catalog never changes while the bot runs, so every option list the
+wizard shows is prebuilt here and stored as a tuple. Views pass a fresh
+list() of the shared tuple to ui.Select; only the placeholder differs per
+step.
+"""
+import discord
+
+from hero_data import FIRST_SKILL, HEROES, HERO_SKILLS
+
+HERO_COUNT_OPTIONS = (
+    discord.SelectOption(label="1 Hero", value="1", description="Bring 1 hero (up to 3 skills)"),
+    discord.SelectOption(label="2 Heroes", value="2", description="Bring 2 heroes (up to 6 skills)"),
+    discord.SelectOption(label="3 Heroes", value="3", description="Bring 3 heroes (up to 9 skills)"),
+)
+
+# Past 4 members only the top 4 skills count; the rest are listed as excluded
+MAX_WIZARD_JOINERS = 20
+
+JOINER_COUNT_OPTIONS = tuple(
+    discord.SelectOption(
+        label=f"{i} Rally Member{'s' if i > 1 else ''}",
+        value=str(i),
+        description=(
+            f"Add {i} rally member{'s' if i > 1 else ''} (contributes to 4 skill pool)" if i <= 4
+            else f"Add {i} rally members (top 4 skills count)"
+        )
+    )
+    for i in range(1, MAX_WIZARD_JOINERS + 1)
+)
+
+CAPTAIN_HERO_OPTIONS = tuple(
+    discord.SelectOption(label=hero, value=hero, description=f"Select {hero} as a captain hero")
+    for hero in HEROES
+)
+
+JOINER_HERO_OPTIONS = tuple(
+    discord.SelectOption(
+        label=hero,
+        value=hero,
+        description=f"First skill: {FIRST_SKILL[hero]} ({HERO_SKILLS[hero][FIRST_SKILL[hero]]['effect']})"
+    )
+    for hero in HEROES
+)
+
+# hero -> skill options, values are "hero|skill"
+SKILL_OPTIONS = {
+    hero: tuple(
+        discord.SelectOption(label=skill_name, value=f"{hero}|{skill_name}", description=skill_data['effect'])
+        for skill_name, skill_data in HERO_SKILLS[hero].items()
+    )
+    for hero in HEROES
+}
+
+# (hero, skill) -> level options showing what each level gives, values are the level
+LEVEL_OPTIONS = {
+    (hero, skill_name): tuple(
+        discord.SelectOption(
+            label=f"Level {level}: +{value}%",
+            value=str(level),
+            description=f"{skill_data['effect']} +{value}%"
+        )
+        for level, value in enumerate(skill_data['values'], 1)
+    )
+    for hero in HEROES
+    for skill_name, skill_data in HERO_SKILLS[hero].items()
+}
+
+# A select needs at least one option even while it is disabled
+WAITING_OPTIONS = (
+    discord.SelectOption(label="Pick a hero first", value="-"),
+)
+
+
+def select(options, placeholder, custom_id, row=None, disabled=False):
+    """ui.Select over a prebuilt option set"""
+    return discord.ui.Select(placeholder=placeholder, options=list(options), custom_id=custom_id, row=row, disabled=disabled)
@@ -0,0 +1,166 @@
+"""Bounded in-memory store for server-side rally sessions.
+
+Sessions are `RallyRecord`s: a `__slots__` object holding the owner and
+the captain as one-byte option codes (see hero_data) instead of a list of
+entry dicts. The store keeps at most `max_sessions`
+records and drops the least recently used one when full; records idle for
+longer than `ttl` seconds are dropped as well.
+
+The step-by-step wizard keeps no server-side state (everything is in its
+custom_ids), so this store only holds sessions that have to live on the
+server, and a flood of `!rally` invocations can't grow it past the cap.
+Channel rally sessions (`!rally session`, see rally_sessions.py) are
+SharedRallyRecords keyed by channel id.
+"""
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from hero_data import (
+    CAPTAIN_OPTION_CODES, CAPTAIN_OPTIONS, FIRST_SKILL, HERO_SKILLS, joiner_code, joiner_from_code
+)
+from top_joiners import TopJoiners
+
+MAX_SESSIONS = int(os.getenv("RALLY_MAX_SESSIONS", "500"))
+SESSION_TTL = float(os.getenv("RALLY_SESSION_TTL", "900"))
+
+
+class RallyRecord:
+    """One rally session: its owner and the captain's option codes (one byte each)"""
+    __slots__ = ('owner', 'captain', 'created', 'touched')
+
+    def __init__(self, owner=None, captain_heroes=()):
+        self.owner = owner
+        self.captain = bytes(CAPTAIN_OPTION_CODES[(e['hero'], e['skill'], e['level'])] for e in captain_heroes)
+        self.created = self.touched = time.monotonic()
+
+    def captain_heroes(self):
+        """Captain as {'hero', 'skill', 'level', 'effect'} entry dicts"""
+        # Imported here: main.py builds the store at startup, before NumPy (which the engine needs) is loaded
+        from rally_engine import make_entry
+        return [make_entry(*CAPTAIN_OPTIONS[code]) for code in self.captain]
+
+    def nbytes(self):
+        return sys.getsizeof(self) + sys.getsizeof(self.captain)
+
+
+class SharedRallyRecord(RallyRecord):
+    """Channel rally session: each member joins with their own hero, one live summary message"""
+    __slots__ = ('nonce', 'captain_name', 'message', 'members', 'top', 'closed')
+
+    def __init__(self, owner, captain_name, captain_heroes, nonce):
+        super().__init__(owner, captain_heroes)
+        self.nonce = nonce  # ties component custom_ids to this session, not a later one in the channel
+        self.captain_name = captain_name
+        self.message = None  # the live summary, set once it has been sent
+        self.members = {}  # user id -> (display name, joiner code), in join order
+        self.top = TopJoiners()  # counted top 4, updated per join/leave instead of re-sorting
+        self.closed = False
+
+    def set_member(self, user_id, name, hero, level):
+        """Add a member, or replace their hero if they joined before"""
+        # A changed pick moves the member to the end of the roster, like leaving and rejoining
+        self.members.pop(user_id, None)
+        self.members[user_id] = (name, joiner_code(hero, level))
+        self.top.add(user_id, HERO_SKILLS[hero][FIRST_SKILL[hero]]['values'][level - 1])
+
+    def remove_member(self, user_id):
+        removed = self.members.pop(user_id, None) is not None
+        if removed:
+            self.top.remove(user_id)
+        return removed
+
+    def member_entry(self, user_id):
+        """(display name, entry dict) for one member"""
+        name, code = self.members[user_id]
+        hero, level = joiner_from_code(code)
+        from rally_engine import make_entry
+        return name, make_entry(hero, FIRST_SKILL[hero], level)
+
+    def member_entries(self):
+        """[(display name, entry dict)] in join order"""
+        return [self.member_entry(user_id) for user_id in self.members]
+
+    def excluded_members(self, limit):
+        """First `limit` members outside the top 4, in join order"""
+        excluded = []
+        for user_id in self.members:
+            if len(excluded) == limit:
+                break
+            if not self.top.is_counted(user_id):
+                excluded.append(self.member_entry(user_id))
+        return excluded
+
+    def nbytes(self):
+        return super().nbytes() + sys.getsizeof(self.members) + sum(
+            sys.getsizeof(name) for name, _ in self.members.values()
+        )
+
+
+class SessionStore:
+    """LRU + TTL bounded mapping of session key -> record"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.clock = clock
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+        self._records = OrderedDict()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return self.get(key, touch=False) is not None
+
+    def _expire(self):
+        # Records are kept in last-used order, so expired ones are all at the front
+        deadline = self.clock() - self.ttl
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.touched > deadline:
+                break
+            del self._records[key]
+            self.evicted_ttl += 1
+
+    def get(self, key, touch=True):
+        """Record for `key`, or None if it was never stored or has been evicted"""
+        self._expire()
+        record = self._records.get(key)
+        if record is not None and touch:
+            record.touched = self.clock()
+            self._records.move_to_end(key)
+        return record
+
+    def put(self, key, record):
+        self._expire()
+        record.touched = self.clock()
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_sessions:
+            self._records.popitem(last=False)
+            self.evicted_lru += 1
+        return record
+
+    def pop(self, key):
+        return self._records.pop(key, None)
+
+    def nbytes(self):
+        """Estimated memory held by the store and its records"""
+        size = sys.getsizeof(self._records)
+        for key, record in self._records.items():
+            size += sys.getsizeof(key) + record.nbytes()
+        return size
+
+    def stats(self):
+        self._expire()
+        return {
+            'sessions': len(self._records),
+            'max_sessions': self.max_sessions,
+            'ttl': self.ttl,
+            'evicted_lru': self.evicted_lru,
+            'evicted_ttl': self.evicted_ttl,
+            'bytes': self.nbytes(),
+        }
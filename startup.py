@@ -0,0 +1,79 @@
+"""Cold-start bookkeeping and lazy feature loading.
+
+main.py imports this module first, so PROCESS_START is (close to) the
+moment the interpreter began running our code. Imports wrapped in
+`timed()` are recorded for the startup report, and LazyFeatures defers the
+heavy rally stack (NumPy engine, lookup table, views) to a worker thread
+started once the bot has connected, so logging in never waits on it.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+# Target for answering the first !alive after process start
+FIRST_ALIVE_BUDGET = float(os.getenv("RALLY_FIRST_ALIVE_BUDGET", "5"))
+
+TIMINGS = {}  # label -> seconds, in the order they were recorded
+MILESTONES = {}  # event -> seconds since PROCESS_START
+
+
+def since_start():
+    return time.perf_counter() - PROCESS_START
+
+
+@contextmanager
+def timed(label):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS[label] = time.perf_counter() - start
+
+
+def milestone(event):
+    """Record the first time `event` happens; returns seconds since start"""
+    if event not in MILESTONES:
+        MILESTONES[event] = since_start()
+    return MILESTONES[event]
+
+
+def report():
+    """One-line summary of import timings and milestones"""
+    imports = ", ".join(f"{label} {seconds * 1000:.0f}ms" for label, seconds in TIMINGS.items())
+    events = ", ".join(f"{event} at {seconds * 1000:.0f}ms" for event, seconds in MILESTONES.items())
+    return f"⏱️ Startup: {imports or 'no timed imports'} | {events or 'no milestones yet'}"
+
+
+class LazyFeatures:
+    """Runs `loader()` once in a worker thread; `await get()` returns its result"""
+
+    def __init__(self, label, loader):
+        self.label = label
+        self.loader = loader
+        self._future = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._future is not None and self._future.done() and not self._future.exception()
+
+    def start(self, loop=None):
+        """Begin loading in the background (idempotent)"""
+        with self._lock:
+            if self._future is None:
+                loop = loop or asyncio.get_running_loop()
+                self._future = loop.run_in_executor(None, self._load)
+        return self._future
+
+    def _load(self):
+        with timed(self.label):
+            result = self.loader()
+        milestone(f"{self.label} ready")
+        return result
+
+    async def get(self):
+        return await asyncio.shield(self.start())
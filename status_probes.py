@@ -0,0 +1,109 @@
+"""Cached, non-blocking HTTP health probes for the status commands.
+
+Probes run concurrently on one pooled aiohttp session, in a background task
+on the bot's event loop. Commands read the last results with `snapshot()`,
+which never waits on the network; results older than the TTL are refreshed
+in the background (at most one refresh in flight at a time).
+"""
+import asyncio
+import time
+
+import aiohttp
+
+PROBE_TTL = 60  # seconds a result is served before it is refreshed
+
+
+class Probe:
+    """One endpoint to check; `expect` is the body a healthy endpoint returns"""
+    __slots__ = ('name', 'url', 'timeout', 'expect')
+
+    def __init__(self, name, url, timeout=5, expect=None):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.expect = expect
+
+
+class ProbeResult:
+    __slots__ = ('ok', 'status', 'response_time', 'checked_at')
+
+    def __init__(self, ok, status, response_time, checked_at):
+        self.ok = ok
+        self.status = status
+        self.response_time = response_time
+        self.checked_at = checked_at
+
+    def age(self):
+        return time.monotonic() - self.checked_at
+
+
+class StatusProbes:
+    def __init__(self, probes, ttl=PROBE_TTL):
+        self.probes = list(probes)
+        self.ttl = ttl
+        self.results = {}
+        self._session = None
+        self._refreshing = None
+        self._task = None
+
+    def start(self, loop):
+        """Schedule the background refresh loop (pass bot.loop before bot.run)"""
+        if self._task is None:
+            self._task = loop.create_task(self._refresh_forever())
+
+    async def _refresh_forever(self):
+        try:
+            while True:
+                await self.refresh()
+                await asyncio.sleep(self.ttl)
+        finally:
+            if self._session is not None:
+                await self._session.close()
+
+    async def _check(self, probe):
+        start = time.monotonic()
+        try:
+            timeout = aiohttp.ClientTimeout(total=probe.timeout)
+            async with self._session.get(probe.url, timeout=timeout) as response:
+                body = await response.text()
+                response_time = f"{round((time.monotonic() - start) * 1000)}ms"
+                if response.status != 200 or (probe.expect is not None and body != probe.expect):
+                    return ProbeResult(False, "⚠️ Responding but not OK", response_time, time.monotonic())
+                return ProbeResult(True, "✅ Online", response_time, time.monotonic())
+        except Exception as e:
+            # Timeouts stringify to an empty message
+            error = str(e) or type(e).__name__
+            return ProbeResult(False, f"❌ Error: {error[:30]}...", "N/A", time.monotonic())
+
+    def _start_refresh(self):
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        return self._refreshing
+
+    async def refresh(self):
+        """Run every probe concurrently; concurrent callers share one refresh"""
+        await asyncio.shield(self._start_refresh())
+
+    async def _refresh(self):
+        try:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            results = await asyncio.gather(*(self._check(probe) for probe in self.probes))
+            for probe, result in zip(self.probes, results):
+                self.results[probe.name] = result
+        finally:
+            self._refreshing = None
+
+    def snapshot(self):
+        """Cached results by probe name (None until the first check finishes).
+
+        Stale results are still returned; a background refresh is kicked off
+        so the next call sees fresh ones.
+        """
+        stale = any(
+            self.results.get(probe.name) is None or self.results[probe.name].age() > self.ttl
+            for probe in self.probes
+        )
+        if stale:
+            self._start_refresh()
+        return {probe.name: self.results.get(probe.name) for probe in self.probes}
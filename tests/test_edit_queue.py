@@ -0,0 +1,73 @@
+"""Edit dispatcher bursts against the rate-limited fake API.
+
+    python -m pytest -q tests/test_edit_queue.py
+"""
+import asyncio
+
+import discord
+
+from edit_queue import EditDispatcher
+from fake_discord import FakeChannel, FakeDiscordAPI, FakeMessage
+
+BURSTS = 20
+
+
+def _embed(version):
+    return discord.Embed(title="live", description=f"v{version}")
+
+
+async def _bursts(api, dispatcher, message_count=3):
+    """Submit BURSTS updates to every message; returns (messages, outcomes, outcomes of a resubmit)"""
+    channel = FakeChannel(1)
+    messages = [FakeMessage(api, channel) for _ in range(message_count)]
+    futures = []
+    for version in range(BURSTS):
+        for message in messages:
+            futures.append(dispatcher.submit(message, embed=_embed(version)))
+        await asyncio.sleep(0.01)
+    outcomes = await asyncio.gather(*futures)
+    repeated = await asyncio.gather(*(dispatcher.submit(message, embed=_embed(BURSTS - 1)) for message in messages))
+    return messages, outcomes, repeated
+
+
+def test_bursts_merge_within_limits():
+    api = FakeDiscordAPI((5, 0.5), (5, 0.5))
+    messages, outcomes, repeated = asyncio.run(_bursts(api, EditDispatcher((5, 0.5), (5, 0.5))))
+    # 60 submits become a handful of edits, none of them over the limit
+    assert len(api.edits) < 3 * BURSTS / 2
+    assert api.rejected == 0
+    assert set(outcomes) == {"sent"}
+    assert [message.embed['description'] for message in messages] == [f"v{BURSTS - 1}"] * 3
+    assert repeated == ["unchanged"] * 3
+
+
+def test_rate_limited_edits_are_retried():
+    # The API allows fewer edits than the dispatcher expects, so some get a 429
+    api = FakeDiscordAPI((2, 0.5), (2, 0.5))
+    messages, outcomes, repeated = asyncio.run(_bursts(api, EditDispatcher((5, 0.5), (5, 0.5))))
+    assert api.rejected > 0
+    assert set(outcomes) == {"sent"}
+    assert [message.embed['description'] for message in messages] == [f"v{BURSTS - 1}"] * 3
+    assert repeated == ["unchanged"] * 3
+
+
+def test_render_callbacks_run_once_per_sent_edit():
+    api = FakeDiscordAPI((5, 0.5), (5, 0.5))
+    dispatcher = EditDispatcher((5, 0.5), (5, 0.5))
+    renders = []
+
+    def render(version):
+        renders.append(version)
+        return _embed(version)
+
+    async def run():
+        message = FakeMessage(api, FakeChannel(1))
+        futures = [dispatcher.submit(message, embed=lambda v=version: render(v)) for version in range(BURSTS)]
+        return message, await asyncio.gather(*futures)
+
+    message, outcomes = asyncio.run(run())
+    # The burst merges into one edit, rendered once from the newest callback
+    assert renders == [BURSTS - 1]
+    assert len(api.edits) == 1
+    assert set(outcomes) == {"sent"}
+    assert message.embed['description'] == f"v{BURSTS - 1}"
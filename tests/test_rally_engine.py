@@ -0,0 +1,136 @@
+"""Engine, optimizer, lookup table and syntax parser against plain-Python baselines.
+
+    python -m pytest -q tests/test_rally_engine.py
+"""
+import itertools
+import random
+
+import pytest
+
+from hero_data import FIRST_SKILL, HERO_EFFECT_OPS, HERO_SKILLS, HEROES
+from rally_engine import calculate_rally, make_entry, score_rallies
+from rally_optimizer import optimize_rally, parse_optimize_query
+from rally_syntax import parse_rally_spec
+from rally_table import build_table, load_table
+
+
+def _random_entry(rng, hero=None, skill=None):
+    hero = hero or rng.choice(HEROES)
+    skill = skill or rng.choice(list(HERO_SKILLS[hero]))
+    return make_entry(hero, skill, rng.randint(1, len(HERO_SKILLS[hero][skill]['values'])))
+
+
+def _random_rally(rng):
+    captain = [_random_entry(rng, hero) for hero in rng.sample(HEROES, rng.randint(1, 3))]
+    joiners = [_random_entry(rng, hero, FIRST_SKILL[hero]) for hero in rng.choices(HEROES, k=rng.randint(0, 12))]
+    return captain, joiners
+
+
+def _baseline_multiplicative(captain, joiners):
+    """main_backup.py's calculate_callback: the captain and every joiner, grouped by effect op"""
+    groups = {}
+    for entry in captain + joiners:
+        op = HERO_EFFECT_OPS[entry['hero']]
+        groups[op] = groups.get(op, 0) + entry['effect']
+    multiplier = 1.0
+    for total in groups.values():
+        multiplier *= 1 + total / 100
+    return (multiplier - 1) * 100
+
+
+def test_score_rallies_matches_calculate_rally():
+    rng = random.Random(1)
+    rallies = [_random_rally(rng) for _ in range(300)]
+    scores = score_rallies([c for c, _ in rallies], [j for _, j in rallies])
+    assert list(scores) == [calculate_rally(c, j)['total'] for c, j in rallies]
+
+
+def test_multiplicative_counts_every_joiner():
+    rng = random.Random(2)
+    rallies = [_random_rally(rng) for _ in range(300)]
+    scores = score_rallies([c for c, _ in rallies], [j for _, j in rallies], rule='multiplicative')
+    assert list(scores) == pytest.approx([_baseline_multiplicative(c, j) for c, j in rallies])
+    # A fifth joiner still counts, unlike the additive top 4
+    captain = [make_entry("Chenko", FIRST_SKILL["Chenko"], 1)]
+    joiners = [make_entry("Fahd", FIRST_SKILL["Fahd"], 5)] * 5
+    assert score_rallies([captain], [joiners], rule='multiplicative')[0] > score_rallies([captain], [joiners[:4]], rule='multiplicative')[0]
+
+
+def test_calculate_rally_keeps_the_first_of_equal_joiners():
+    joiners = [make_entry(hero, FIRST_SKILL[hero], 1) for hero in ("Fahd", "Fahd", "Fahd", "Fahd", "Fahd")]
+    result = calculate_rally([make_entry("Chenko", FIRST_SKILL["Chenko"], 1)], joiners)
+    assert [id(e) for e in result['counted']] == [id(e) for e in joiners[:4]]
+    assert [id(e) for e in result['excluded']] == [id(joiners[4])]
+
+
+@pytest.mark.parametrize("rule", ["additive", "multiplicative"])
+def test_optimizer_matches_brute_force(rule):
+    owned = ["Chenko", "Amadeus", "Fahd", "Saul"]
+    joiner_heroes = ["Fahd", "Saul", "Amane"]
+    result = optimize_rally(owned, joiner_heroes, max_level=3, rule=rule, joiner_slots=2, time_budget=30)
+    assert result['complete']
+
+    captain_options = [
+        [make_entry(hero, skill, min(3, len(data['values']))) for skill, data in HERO_SKILLS[hero].items()]
+        for hero in owned
+    ]
+    joiner_options = [make_entry(hero, FIRST_SKILL[hero], min(3, len(HERO_SKILLS[hero][FIRST_SKILL[hero]]['values'])))
+                      for hero in joiner_heroes]
+    best = max(
+        score_rallies([list(captain)], [list(joiners)], rule=rule)[0]
+        for trio in itertools.combinations(captain_options, 3)
+        for captain in itertools.product(*trio)
+        for joiners in itertools.combinations_with_replacement(joiner_options, 2)
+    )
+    assert result['total'] == pytest.approx(best)
+
+
+def test_optimize_query_options():
+    assert parse_optimize_query("heroes=chenko, amadeus max=4 rule=Multiplicative") == {
+        'owned': ["Chenko", "Amadeus"], 'max_level': 4, 'rule': 'multiplicative',
+    }
+    with pytest.raises(ValueError, match="Unexpected text"):
+        parse_optimize_query("Chenko")
+
+
+def test_lookup_table_matches_summed_entries(tmp_path):
+    build_table(str(tmp_path))
+    table = load_table(str(tmp_path))
+    rng = random.Random(3)
+    for _ in range(200):
+        captain, _ = _random_rally(rng)
+        assert table.captain_total(captain) == sum(entry['effect'] for entry in captain)
+        breakdown = {}
+        for entry in captain:
+            effect = HERO_SKILLS[entry['hero']][entry['skill']]['effect']
+            breakdown[effect] = breakdown.get(effect, 0) + entry['effect']
+        # Effects that add nothing are left out
+        assert table.effect_breakdown(captain) == {name: value for name, value in breakdown.items() if value}
+    first, second = (make_entry("Chenko", skill, 1) for skill in list(HERO_SKILLS["Chenko"])[:2])
+    for captain in ([first, second], [first, first]):
+        with pytest.raises(ValueError, match="distinct"):
+            table.row(captain)
+
+
+def test_rally_syntax_parses_captain_and_joiners():
+    captain, joiners = parse_rally_spec("chenko:stand of arms:5 Amadeus:Battle Ready:4 | Fahd:5 saul:3")
+    assert [(e['hero'], e['skill'], e['level']) for e in captain] == [
+        ("Chenko", "Stand of Arms", 5), ("Amadeus", "Battle Ready", 4),
+    ]
+    assert [(e['hero'], e['skill'], e['level']) for e in joiners] == [
+        ("Fahd", FIRST_SKILL["Fahd"], 5), ("Saul", FIRST_SKILL["Saul"], 3),
+    ]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("Chenko:Stand of Arms:5 | Fahd:5 | Saul:3", "single `|`"),
+    ("Nobody:Stand of Arms:5", "Unknown hero"),
+    ("Chenko:Nothing:5", "no skill called"),
+    ("Chenko:Stand of Arms:9", "no level 9"),
+    ("Chenko:Stand of Arms:5 Chenko:Stand of Arms:4", "listed twice"),
+    ("| Fahd:5", "1-3 heroes"),
+    ("Chenko:Stand of Arms:5 | Fahd", "expected Hero:Level"),
+])
+def test_rally_syntax_errors(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse_rally_spec(spec)
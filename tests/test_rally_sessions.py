@@ -0,0 +1,97 @@
+"""Concurrent joins to a shared rally session over the rate-limited fake API.
+
+    python -m pytest -q tests/test_rally_sessions.py
+"""
+import asyncio
+import random
+
+import pytest
+
+import rally_sessions
+from edit_queue import EditDispatcher
+from fake_discord import FakeChannel, FakeDiscordAPI, FakeInteraction, FakeMessage, FakeUser
+from hero_data import FIRST_SKILL, HEROES, HERO_SKILLS
+from session_store import SessionStore
+
+MEMBERS = 60
+
+
+class _Context:
+    """The parts of a commands.Context that open_session uses"""
+
+    def __init__(self, author, channel, api):
+        self.author = author
+        self.channel = channel
+        self.api = api
+
+    async def send(self, embed=None, view=None):
+        message = FakeMessage(self.api, self.channel)
+        message.apply(embed, view)
+        return message
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = FakeDiscordAPI((5, 0.5), (5, 0.5))
+    monkeypatch.setattr(rally_sessions, "EDITS", EditDispatcher((5, 0.5), (5, 0.5)))
+    return api
+
+
+async def _click(store, user, custom_id, values=None, message=None):
+    interaction = FakeInteraction(user, message or FakeMessage(), custom_id, values)
+    assert await rally_sessions.route_session_interaction(interaction, store)
+    return interaction.calls[-1][1]
+
+
+async def _join(store, sid, user, hero, level, rng):
+    """Join, pick a hero, pick a level; returns the ephemeral reply"""
+    await asyncio.sleep(rng.uniform(0, 0.3))
+    picker = FakeMessage()
+    picker.apply(view=(await _click(store, user, f"rally:sjoin:{sid}"))['view'])
+    await _click(store, user, f"rally:shero:{sid}", [hero], picker)
+    level_id = next(custom_id for custom_id in picker.components if custom_id.startswith("rally:slevel"))
+    return (await _click(store, user, level_id, [str(level)], picker))['content']
+
+
+async def _run_session(api):
+    """Open a session, let MEMBERS players join at once, close it; returns (record, picks, replies, live summary)"""
+    channel = FakeChannel(42)
+    store = SessionStore()
+    captain = FakeUser(1, "Cap")
+    record = await rally_sessions.open_session(_Context(captain, channel, api), store, "Chenko:Stand of Arms:5")
+    sid = rally_sessions.session_id(record, channel.id)
+    rng = random.Random(1)
+    picks = {}
+    for n in range(MEMBERS):
+        hero = rng.choice(HEROES)
+        picks[FakeUser(100 + n, f"M{n}")] = hero, rng.randint(1, len(HERO_SKILLS[hero][FIRST_SKILL[hero]]['values']))
+    replies = await asyncio.gather(*(_join(store, sid, user, *pick, rng) for user, pick in picks.items()))
+    while rally_sessions.EDITS.pending:
+        await asyncio.sleep(0.05)
+    live = record.message.embed['description']
+    await _click(store, captain, f"rally:sclose:{sid}")
+    while rally_sessions.EDITS.pending:
+        await asyncio.sleep(0.05)
+    return record, picks, replies, live
+
+
+def test_concurrent_joins_are_not_lost(api):
+    record, picks, replies, live = asyncio.run(_run_session(api))
+    assert all(reply.startswith("✅") for reply in replies)
+    assert len(record.members) == MEMBERS
+    assert f"**Members:** {MEMBERS}/{rally_sessions.MAX_MEMBERS}" in live
+    values = sorted((HERO_SKILLS[hero][FIRST_SKILL[hero]]['values'][level - 1] for hero, level in picks.values()), reverse=True)
+    assert record.top.total == sum(values[:4])
+    # Far fewer edits than joins, and none over the limit
+    assert len(api.edits) < MEMBERS
+    assert api.rejected == 0
+    names = record.message.embed['fields'][0]['value'].split(", ")
+    assert sorted(names) == sorted(user.display_name for user in picks)
+
+
+def test_full_session_turns_members_away(api, monkeypatch):
+    monkeypatch.setattr(rally_sessions, "MAX_MEMBERS", 50)
+    record, picks, replies, live = asyncio.run(_run_session(api))
+    assert len(record.members) == 50
+    assert sum("full" in reply for reply in replies) == MEMBERS - 50
+    assert api.rejected == 0
@@ -0,0 +1,88 @@
+"""Wizard clicks replayed with the fake Discord objects.
+
+    python -m pytest -q tests/test_rally_views.py
+"""
+import asyncio
+import random
+
+import pytest
+
+from fake_discord import FakeInteraction, FakeUser, WizardDriver
+from hero_data import FIRST_SKILL, HERO_SKILLS, HEROES
+from rally_engine import MAX_CAPTAIN_HEROES, make_entry
+from rally_views import RallyState, route_interaction
+from select_catalog import MAX_WIZARD_JOINERS
+
+
+async def _click_as(user, driver, action, value=None):
+    interaction = FakeInteraction(user, driver.message, driver.custom_id(action), [value] if value else None)
+    assert await route_interaction(interaction)
+    return interaction
+
+
+def test_only_the_owner_can_continue_a_rally():
+    async def run():
+        driver = WizardDriver(FakeUser(1, "Cap"))
+        await driver.start()
+        await driver.click("hc", "1")
+        before = dict(driver.message.embed)
+        other = await _click_as(FakeUser(2, "Other"), driver, "ch", "Chenko")
+        assert other.calls[0][0] == "send_message" and other.calls[0][1]['ephemeral']
+        assert driver.message.embed == before
+        await driver.click("ch", "Chenko")
+        assert "**Captain:** Cap" in driver.message.embed['description']
+        assert RallyState.decode(driver.custom_id("cs").split(":", 2)[2]).owner == 1
+
+    asyncio.run(run())
+
+
+def test_rallies_without_an_owner_still_decode():
+    state = RallyState.decode("10..---")
+    assert state.owner is None and state.hero_count == 1
+
+
+def test_level_select_lists_the_skill_values():
+    async def run():
+        driver = WizardDriver(FakeUser(1, "Cap"))
+        await driver.start()
+        await driver.click("hc", "1")
+        await driver.click("ch", "Jabel")
+        assert driver.message.components[driver.custom_id("cl")]['disabled']
+        await driver.click("cs", f"Jabel|{next(iter(HERO_SKILLS['Jabel']))}")
+        options = driver.message.components[driver.custom_id("cl")]['options']
+        # Jabel's first skill (No Skill) has a single level
+        assert [option['value'] for option in options] == ["1"]
+        assert options[0]['label'].startswith("Level 1: +")
+
+    asyncio.run(run())
+
+
+def test_rally_state_round_trips():
+    rng = random.Random(4)
+    for _ in range(300):
+        hero_count = rng.randint(0, MAX_CAPTAIN_HEROES)
+        captains = [
+            make_entry(hero, skill, rng.randint(1, len(HERO_SKILLS[hero][skill]['values'])))
+            for hero in rng.sample(HEROES, hero_count)
+            for skill in [rng.choice(list(HERO_SKILLS[hero]))]
+        ][:rng.randint(0, hero_count)]
+        joiners = [
+            make_entry(hero, FIRST_SKILL[hero], rng.randint(1, len(HERO_SKILLS[hero][FIRST_SKILL[hero]]['values'])))
+            for hero in rng.choices(HEROES, k=rng.randint(0, MAX_WIZARD_JOINERS))
+        ]
+        hero = rng.choice([None, *HEROES])
+        skill = rng.choice(list(HERO_SKILLS[hero])) if hero and rng.random() < 0.5 else None
+        level = rng.randint(1, 5) if skill and rng.random() < 0.5 else None
+        owner = rng.choice([None, 0, 1, rng.getrandbits(64)])
+        state = RallyState(owner, hero_count, len(joiners), captains, joiners, hero, skill, level)
+
+        decoded = RallyState.decode(state.encode())
+        assert [getattr(decoded, name) for name in RallyState.__slots__] == [getattr(state, name) for name in RallyState.__slots__]
+        # Ids must fit Discord's 100 character custom_id limit
+        assert len(state.custom_id("cl")) <= 100
+
+
+@pytest.mark.parametrize("encoded", ["", "1", "9a..---", "10..--", "10..---.a.b", "10.?.---"])
+def test_malformed_rally_states_are_rejected(encoded):
+    with pytest.raises(ValueError, match="Malformed"):
+        RallyState.decode(encoded)
@@ -0,0 +1,115 @@
+"""Streaming roster parsers fed with hand-made chunks.
+
+    python -m pytest -q tests/test_roster_import.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+
+import roster_import
+from roster_import import HeroRoster, MAX_NAME_CHARS, read_roster
+
+
+async def _chunks(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _read(filename, text, size=7, roster=None):
+    return asyncio.run(read_roster(filename, _chunks(text.encode(), size), roster))
+
+
+def test_csv_reports_malformed_rows_with_line_numbers():
+    roster = _read("roster.csv", "name,hero,level\nAna,Chenko,5\nBo,Nobody,3\nCy,Fahd\nDi,Saul,3.7\nEd,Jabel,2\nFi,Amane,4\n")
+    assert sorted(roster.members) == ["ana", "fi"]
+    assert roster.invalid == 4
+    assert roster.errors == [
+        "line 3: unknown hero `Nobody`",
+        "line 4: expected 3 columns",
+        "line 5: level `3.7` isn't a whole number",
+        "line 6: Jabel - No Skill has no level 2 (1-1)",
+    ]
+
+
+def test_csv_header_needs_a_level_column():
+    with pytest.raises(ValueError, match="needs a `level` column"):
+        _read("roster.csv", "name,hero\nAna,Chenko\n")
+
+
+def test_json_rejects_levels_that_are_not_whole_numbers():
+    roster = _read(
+        "roster.json",
+        '[{"name": "Ana", "hero": "Chenko", "level": 5}, {"name": "Bo", "hero": "Fahd", "level": "4"},'
+        ' {"name": "Cy", "hero": "Saul", "level": 3.7}, {"name": "Di", "hero": "Saul", "level": true},'
+        ' {"name": "Ed", "hero": "Saul", "level": "5.0"}]'
+    )
+    assert sorted(roster.members) == ["ana", "bo"]
+    assert [error.split(": ", 1)[1] for error in roster.errors] == [
+        "level `3.7` isn't a whole number", "level `True` isn't a whole number", "level `5.0` isn't a whole number",
+    ]
+
+
+def test_names_are_capped():
+    long_name = "N" * 100
+    roster = _read("roster.csv", f"{long_name},Chenko,5\n")
+    assert [name for name, _ in roster.members.values()] == ["N" * MAX_NAME_CHARS]
+    heroes = _read("roster.json", f'{{"name": "{long_name}", "hero": "Chenko", "level": 5}}', roster=HeroRoster())
+    assert heroes.owned() == [("N" * MAX_NAME_CHARS, (("Chenko", 5),))]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 64])
+def test_json_values_split_across_chunks(size):
+    # Multi-byte names and line numbers have to survive any chunk boundary
+    text = '[\n  {"name": "Zoë ⚔️", "hero": "Chenko", "level": 5},\n  {"name": "Bo", "hero": "Nobody", "level": 1}\n]\n'
+    roster = _read("roster.json", text, size)
+    assert [name for name, _ in roster.members.values()] == ["Zoë ⚔️"]
+    assert roster.errors == ["line 3: unknown hero `Nobody`"]
+    lines = _read("roster.jsonl", '{"name": "A", "hero": "Fahd", "level": 2}\n{"name": "B", "hero": "Saul", "level": 3}\n', size)
+    assert sorted(lines.members) == ["a", "b"]
+
+
+def test_json_cut_off_mid_object():
+    with pytest.raises(ValueError, match="ends in the middle"):
+        _read("roster.json", '[{"name": "Ana", "hero": "Chen')
+
+
+def test_row_cap(monkeypatch):
+    monkeypatch.setattr(roster_import, "MAX_IMPORT_ROWS", 3)
+    with pytest.raises(ValueError, match="limited to 3 rows"):
+        _read("roster.csv", "Chenko,5\n" * 4)
+
+
+def test_size_cap_from_the_attachment():
+    attachment = SimpleNamespace(filename="big.csv", size=roster_import.MAX_IMPORT_BYTES + 1, url="http://127.0.0.1:1/")
+
+    async def run():
+        async for _ in roster_import.attachment_chunks(attachment):
+            pass
+
+    with pytest.raises(ValueError, match="the limit is"):
+        asyncio.run(run())
+
+
+def test_size_cap_while_streaming():
+    # The reported size can be wrong, so the downloaded bytes are counted as well
+    async def serve(request):
+        # Blank lines, so the row cap doesn't stop the parser first
+        return web.Response(body=b"\n" * (roster_import.MAX_IMPORT_BYTES + 1))
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/roster.csv", serve)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        port = runner.addresses[0][1]
+        attachment = SimpleNamespace(filename="roster.csv", size=10, url=f"http://127.0.0.1:{port}/roster.csv")
+        try:
+            await read_roster(attachment.filename, roster_import.attachment_chunks(attachment))
+        finally:
+            await runner.cleanup()
+
+    with pytest.raises(ValueError, match="over the 1024 KiB limit"):
+        asyncio.run(run())
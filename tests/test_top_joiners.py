@@ -0,0 +1,30 @@
+"""TopJoiners against a brute-force stable sort of the roster.
+
+    python -m pytest -q tests/test_top_joiners.py
+"""
+import random
+
+from top_joiners import TopJoiners
+
+
+def test_matches_stable_sort():
+    rng = random.Random(3)
+    for _ in range(300):
+        top = TopJoiners()
+        roster = {}  # member -> (effect, join order); a re-join counts as a new join
+        joins = 0
+        for _ in range(rng.randint(1, 400)):
+            if roster and rng.random() < 0.35:
+                member = rng.choice(list(roster))
+                top.remove(member)
+                del roster[member]
+            else:
+                member, effect = rng.randint(0, 120), rng.choice([5, 10, 15, 20, 25])
+                top.add(member, effect)
+                roster.pop(member, None)
+                roster[member] = (effect, joins)
+                joins += 1
+            expected = sorted(roster, key=lambda m: (-roster[m][0], roster[m][1]))[:4]
+            assert [member for member, _ in top.counted()] == expected
+            assert top.total == sum(roster[member][0] for member in expected)
+            assert top.excluded_count == len(roster) - len(expected)
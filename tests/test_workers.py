@@ -0,0 +1,71 @@
+"""Jobs on the shared worker pool, including from inside a cluster worker.
+
+    python -m pytest -q tests/test_workers.py
+"""
+import asyncio
+import multiprocessing
+
+import cluster
+import rally_assign
+import workers
+
+ROSTER = [
+    ("Ana", (("Chenko", 5), ("Amadeus", 4))),
+    ("Bo", (("Fahd", 5),)),
+    ("Cy", (("Saul", 3), ("Gordon", 5))),
+    ("Di", (("Quinn", 2),)),
+    ("Ed", (("Howard", 4), ("Hilde", 1))),
+    ("Fi", (("Yeonwoo", 5),)),
+]
+
+
+async def _assign():
+    return await workers.run(rally_assign.assign_rallies, ROSTER, 1, time_budget=2)
+
+
+def _cluster_job(worker_id, shard_ids, shard_count, reports, start_delay):
+    """Stands in for cluster.worker_main: start the pool as main.py does, then run a job"""
+    workers.start()
+    try:
+        result = asyncio.run(_assign())
+        reports.put({'worker': worker_id, 'pool': workers.get_pool() is not None, 'total': result['total']})
+    finally:
+        workers.shutdown()
+
+
+def _daemon_job(results):
+    result = asyncio.run(_assign())
+    results.put((workers.get_pool() is None, result['total']))
+
+
+def test_job_runs_in_pool():
+    result = asyncio.run(_assign())
+    assert workers.get_pool() is not None
+    # Ana captains (25 + 20), the four best joiners bring 25 + 25 + 25 + 16
+    assert result['total'] == 136
+
+
+def test_job_runs_inside_cluster_worker():
+    coordinator = cluster.Coordinator(shard_count=1, workers=1)
+    coordinator.target = _cluster_job
+    coordinator.start_worker(0)
+    process = coordinator.processes[0]
+    try:
+        report = coordinator.reports.get(timeout=60)
+        process.join(timeout=30)
+    finally:
+        coordinator.stop()
+    assert not process.daemon
+    assert report == {'worker': 0, 'pool': True, 'total': 136}
+    assert process.exitcode == 0
+
+
+def test_daemonic_process_falls_back_to_threads():
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_daemon_job, args=(results,), daemon=True)
+    process.start()
+    try:
+        assert results.get(timeout=60) == (True, 136)
+    finally:
+        process.join(timeout=10)
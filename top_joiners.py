@@ -0,0 +1,109 @@
+"""Incremental top-k tracking for rallies with many joiners.
+
+Only the 4 highest joiner skills count, so a rally roster that changes one
+member at a time doesn't need re-sorting. TopJoiners keeps the counted
+members in a min-heap of at most k entries (weakest counted member on
+top) and everyone else in a max-heap of excluded members:
+- a new member either stays excluded (one heap push) or replaces the
+  weakest counted member, who moves to the excluded heap
+- removing a counted member promotes the best excluded one; removing an
+  excluded member only marks its heap entry stale, and stale entries are
+  skipped when popped and compacted once they pile up
+
+Ties keep the earlier joiner, the same order as a stable sort by value.
+Only the standard library is used, so session records can hold one
+without loading the NumPy engine.
+"""
+import heapq
+import itertools
+
+TOP_JOINERS = 4
+
+
+class TopJoiners:
+    def __init__(self, k=TOP_JOINERS):
+        self.k = k
+        self.total = 0  # sum of the counted members' effects
+        self._seq = itertools.count()
+        self._entries = {}  # member -> (effect, seq)
+        self._counted = []  # min-heap of (effect, -seq, member)
+        self._counted_ids = set()
+        self._excluded = []  # max-heap of (-effect, seq, member), may hold stale entries
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, member):
+        return member in self._entries
+
+    def is_counted(self, member):
+        return member in self._counted_ids
+
+    @property
+    def excluded_count(self):
+        return len(self._entries) - len(self._counted)
+
+    def add(self, member, effect):
+        """Add a member, or re-rank one whose effect changed (they rejoin last on ties)"""
+        if member in self._entries:
+            self.remove(member)
+        seq = next(self._seq)
+        self._entries[member] = (effect, seq)
+        item = (effect, -seq, member)
+        if len(self._counted) < self.k:
+            heapq.heappush(self._counted, item)
+            self._counted_ids.add(member)
+            self.total += effect
+        elif item > self._counted[0]:
+            # Beats the weakest counted member, who drops to the excluded heap
+            weakest_effect, weakest_neg_seq, weakest = heapq.heapreplace(self._counted, item)
+            self._counted_ids.discard(weakest)
+            self._counted_ids.add(member)
+            self.total += effect - weakest_effect
+            heapq.heappush(self._excluded, (-weakest_effect, -weakest_neg_seq, weakest))
+        else:
+            heapq.heappush(self._excluded, (-effect, seq, member))
+
+    def remove(self, member):
+        """Drop a member; returns False if they weren't in the roster"""
+        entry = self._entries.pop(member, None)
+        if entry is None:
+            return False
+        if member in self._counted_ids:
+            # The counted heap holds at most k entries, so rebuilding it is O(k)
+            self._counted = [item for item in self._counted if item[2] != member]
+            heapq.heapify(self._counted)
+            self._counted_ids.discard(member)
+            self.total -= entry[0]
+            self._promote()
+        else:
+            self._stale += 1
+            if self._stale > 64 and self._stale > len(self._excluded) // 2:
+                self._compact()
+        return True
+
+    def _live(self, item):
+        neg_effect, seq, member = item
+        return self._entries.get(member) == (-neg_effect, seq)
+
+    def _promote(self):
+        while self._excluded:
+            item = heapq.heappop(self._excluded)
+            if not self._live(item):
+                self._stale -= 1
+                continue
+            neg_effect, seq, member = item
+            heapq.heappush(self._counted, (-neg_effect, -seq, member))
+            self._counted_ids.add(member)
+            self.total -= neg_effect
+            return
+
+    def _compact(self):
+        self._excluded = [item for item in self._excluded if self._live(item)]
+        heapq.heapify(self._excluded)
+        self._stale = 0
+
+    def counted(self):
+        """[(member, effect)] of the counted members, best first"""
+        return [(member, effect) for effect, _, member in sorted(self._counted, reverse=True)]
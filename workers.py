@@ -0,0 +1,107 @@
+"""Shared process pool for CPU-heavy rally work (assignment search, simulations).
+
+    result = await workers.run(assign_rallies, roster, 3, time_budget=5)
+
+Searches that take seconds of pure Python would stall the gateway
+heartbeat and every other guild if they ran on the event loop, and
+threads don't help while they hold the GIL. Jobs run in a small
+ProcessPoolExecutor instead (RALLY_POOL_WORKERS processes, default 2).
+
+The workers are forked, not spawned: a spawned (or forkserver) worker
+re-imports main.py, which would build a second bot. Forking a process
+that already runs threads can leave a child stuck on a lock another
+thread held, so main.py calls start() near the top of the file, before
+discord is imported and before py-cord, the keep-alive server or the
+feature loader start any thread. Everything imported after that point
+is imported again by each worker on its first job, so job functions
+live in modules that only need hero_data and NumPy (rally_assign,
+chance_sim), and their arguments and results must pickle.
+
+Jobs run in the default thread executor instead when there is no pool
+to use: RALLY_POOL_WORKERS=0, a daemonic process (which may not have
+children), or a pool whose worker died (replacing it would mean forking
+the now multithreaded bot).
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+POOL_WORKERS = int(os.getenv("RALLY_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+JOB_GRACE = 30.0  # seconds past a job's own time budget before we stop waiting for it
+
+_pool = None
+_broken = False
+_lock = threading.Lock()
+
+
+def pool_available():
+    return POOL_WORKERS > 0 and not _broken and not multiprocessing.current_process().daemon
+
+
+def _ready():
+    return os.getpid()
+
+
+def start():
+    """Fork the workers now; call while the process has no other threads"""
+    get_pool()
+
+
+def get_pool():
+    """The shared pool, or None if jobs have to run in threads"""
+    global _pool
+    with _lock:
+        if _pool is None and pool_available():
+            _pool = ProcessPoolExecutor(POOL_WORKERS, mp_context=multiprocessing.get_context("fork"))
+            # With fork, the first submit forks every worker before the pool starts its manager thread
+            _pool.submit(_ready)
+        return _pool
+
+
+def _mark_broken(pool):
+    """Stop using a pool whose worker died; later jobs run in threads"""
+    global _pool, _broken
+    with _lock:
+        if _pool is pool:
+            _pool = None
+            _broken = True
+            print("⚠️ Worker pool broke, running rally jobs in threads from now on")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run(fn, *args, time_budget=None, **kwargs):
+    """Run fn(*args, time_budget=..., **kwargs) in the pool and await the result.
+
+    `time_budget` is passed to fn, which should return its best answer by
+    then; we give up waiting (TimeoutError) JOB_GRACE seconds later, which
+    also covers time spent queued behind other jobs.
+    """
+    if time_budget is not None:
+        kwargs['time_budget'] = time_budget
+    pool = get_pool()
+    future = asyncio.get_running_loop().run_in_executor(pool, _call, fn, args, kwargs)
+    try:
+        if time_budget is None:
+            return await future
+        return await asyncio.wait_for(future, time_budget + JOB_GRACE)
+    except BrokenProcessPool:
+        _mark_broken(pool)
+        raise
+
+
+def _call(fn, args, kwargs):
+    return fn(*args, **kwargs)
+
+
+def shutdown():
+    """Stop the workers and wait for them to exit"""
+    # A multiprocessing child (a cluster worker) must call this before its target
+    # returns: on exit it joins its children before the pool's exit hook stops them
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)